@@ -0,0 +1,796 @@
+"""
+Benchmarks for the platformer game
+Usage: python bench.py [name ...]   (runs every benchmark when no name is given)
+"""
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+
+import arcade
+import numpy as np
+
+import env
+import main
+
+TILE_SIZE = 128 * main.TILE_SCALING
+
+
+def timed(func, repeat=3):
+    """Best wall-clock time of func() over a few runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_platforms(columns, seed=0):
+    """Ground row plus random floating ledges, laid out like a tilemap layer."""
+    rng = random.Random(seed)
+    texture = arcade.load_texture(":resources:images/tiles/grassMid.png")
+    tiles = arcade.SpriteList()
+    for col in range(columns):
+        if rng.random() < 0.1:
+            continue  # pit
+        ground = arcade.Sprite(texture, main.TILE_SCALING)
+        ground.left = col * TILE_SIZE
+        ground.bottom = 0
+        tiles.append(ground)
+        if rng.random() < 0.3:
+            ledge = arcade.Sprite(texture, main.TILE_SCALING)
+            ledge.left = col * TILE_SIZE
+            ledge.bottom = TILE_SIZE * rng.randint(2, 5)
+            tiles.append(ledge)
+    return tiles
+
+
+def linear_ground_y(tiles, x_pos):
+    """The original full-layer scan, kept as the reference implementation."""
+    ground_y = -100
+    for tile in tiles:
+        if tile.left < x_pos < tile.right:
+            if tile.top > ground_y:
+                ground_y = tile.top
+    return ground_y
+
+
+def bench_heightmap():
+    print("columns   tiles   linear(ms)  build(ms)  indexed(ms)  speedup")
+    for columns in (100, 500, 1_000, 3_000):
+        tiles = make_platforms(columns)
+        width = columns * TILE_SIZE
+        # Same query pattern as place_dynamic_objects: one lookup every ~300 px
+        queries = [x + random.randint(-50, 50) for x in range(400, int(width - 200), 300)]
+
+        heightmap = main.Heightmap(tiles, TILE_SIZE)
+        for x in queries[::10]:
+            assert heightmap.ground_y(x) == linear_ground_y(tiles, x)
+
+        t_linear = timed(lambda: [linear_ground_y(tiles, x) for x in queries], repeat=1)
+        t_build = timed(lambda: main.Heightmap(tiles, TILE_SIZE))
+        t_indexed = timed(lambda: [heightmap.ground_y(x) for x in queries])
+        print(f"{columns:7d} {len(tiles):7d} {t_linear * 1000:11.1f} {t_build * 1000:10.2f} "
+              f"{t_indexed * 1000:12.3f} {t_linear / (t_build + t_indexed):8.0f}x")
+
+
+def bench_assets():
+    cache = main.AssetCache()
+
+    def load_all():
+        for character in main.CHARACTERS:
+            cache.character(character)
+            cache.sounds()
+
+    t_cold = timed(lambda: (cache.clear(), load_all()))
+    t_warm = timed(load_all)
+    print(f"cold load of {len(main.CHARACTERS)} characters: {t_cold * 1000:.1f} ms")
+    print(f"warm load of {len(main.CHARACTERS)} characters: {t_warm * 1000:.3f} ms")
+    print(f"stats: {cache.stats()}")
+
+
+def make_item_scene():
+    scene = arcade.Scene()
+    for _, _, layer in main.ITEMS.values():
+        scene.add_sprite_list(layer)
+    return types.SimpleNamespace(scene=scene)
+
+
+def spawn_per_sprite(holder, placements):
+    """The original spawning path: resolve the resource and add each sprite on its own."""
+    for kind, center_x, bottom in placements:
+        path, scale, layer = main.ITEMS[kind]
+        sprite = arcade.Sprite(path, scale)
+        sprite.center_x = center_x
+        sprite.bottom = bottom
+        holder.scene.add_sprite(layer, sprite)
+
+
+def bench_spawn():
+    rng = random.Random(0)
+    kinds = list(main.ITEMS)
+    main.ASSETS.items()  # first-load cost is measured by the assets benchmark
+
+    print("  spawns  per-sprite(ms)  batched(ms)  speedup")
+    for count in (1_000, 10_000, 100_000):
+        placements = [(rng.choice(kinds), rng.uniform(0, 1e6), rng.uniform(0, 500)) for _ in range(count)]
+        t_old = timed(lambda: spawn_per_sprite(make_item_scene(), placements), repeat=1)
+        t_new = timed(lambda: main.GameView.place_dynamic_objects(make_item_scene(), placements), repeat=1)
+        print(f"{count:8d} {t_old * 1000:15.1f} {t_new * 1000:12.1f} {t_old / t_new:8.1f}x")
+
+
+def bench_collisions():
+    rng = random.Random(0)
+    player = arcade.Sprite(main.ASSETS.character(main.CHARACTERS[0])["idle"])
+    player.position = (5_000, 200)
+    frames = 600
+
+    print("   items  per-layer lists(us/frame)  entity index(us/frame)")
+    for count in (100, 1_000, 10_000):
+        scene = make_item_scene().scene
+        placements = [(rng.choice(["coin_bronze", "coin_silver", "bomb", "gem", "key"]),
+                       rng.uniform(0, 100_000), rng.uniform(0, 600)) for _ in range(count)]
+        main.GameView.place_dynamic_objects(types.SimpleNamespace(scene=scene), placements)
+        layers = [scene[name] for name in ("Bombs", "Coins_Bronze", "Coins_Silver", "Gems", "Keys")]
+
+        index = main.EntityIndex()
+        index.add_layers(scene, main.PICKUP_LAYERS)
+
+        def per_layer():
+            for _ in range(frames):
+                for layer in layers:
+                    # CPU brute force: without a window arcade can't take its GPU path for big lists
+                    arcade.check_for_collision_with_list(player, layer, method=3)
+
+        def indexed():
+            for _ in range(frames):
+                index.overlapping(player)
+
+        t_old = timed(per_layer, repeat=1) / frames
+        t_new = timed(indexed) / frames
+        print(f"{count:8d} {t_old * 1e6:26.1f} {t_new * 1e6:23.2f}")
+
+
+def make_physics_world(columns, crate_every=0, seed=0):
+    """Flat ground of columns tiles, optionally with crate stacks every crate_every columns."""
+    rng = random.Random(seed)
+    ground = arcade.SpriteList(use_spatial_hash=True)
+    texture = arcade.load_texture(":resources:images/tiles/grassMid.png")
+    for col in range(columns):
+        tile = arcade.Sprite(texture, main.TILE_SCALING)
+        tile.left = col * TILE_SIZE
+        tile.bottom = 0
+        ground.append(tile)
+
+    crates = arcade.SpriteList()
+    crate_texture = arcade.load_texture(main.ITEMS["crate"][0])
+    if crate_every:
+        for col in range(8, columns, crate_every):
+            for level in range(rng.randint(1, 3)):
+                crate = arcade.Sprite(crate_texture, main.TILE_SCALING)
+                crate.left = col * TILE_SIZE
+                crate.bottom = TILE_SIZE + level * TILE_SIZE
+                crates.append(crate)
+    return [crates, ground]
+
+
+def run_physics(engine_class, walls, script, ticks, start=(128, 200)):
+    """
+    Drive a player with script ([(tick, change_x, jump)]) and return its per-tick
+    (x, y, can_jump) plus the seconds spent stepping the engine.
+    """
+    player = arcade.Sprite(main.ASSETS.character(main.CHARACTERS[0])["idle"])
+    player.position = start
+    engine = engine_class(player, walls=walls, gravity_constant=main.GRAVITY)
+    actions = {tick: (change_x, jump) for tick, change_x, jump in script}
+    trajectory = []
+    step_time = 0
+    for tick in range(ticks):
+        start_time = time.perf_counter()
+        if tick in actions:
+            change_x, jump = actions[tick]
+            player.change_x = change_x
+            if jump and engine.can_jump():
+                player.change_y = main.PLAYER_JUMP_SPEED
+        engine.update()
+        can_jump = engine.can_jump()
+        step_time += time.perf_counter() - start_time
+        trajectory.append((player.center_x, player.center_y, can_jump))
+    return trajectory, step_time
+
+
+def bench_physics():
+    """Per-step cost of both engines as the level (and its unhashed crate list) grows. Equivalence is in tests/test_physics.py."""
+    speed = main.PLAYER_MOVEMENT_SPEED
+    print("columns  crates  arcade(us/step)  grid(us/step)   (update + can_jump)")
+    script = [(0, speed, False)] + [(tick, speed, True) for tick in range(20, 600, 40)]
+    # Kept under 1500 crates: past that arcade wants its GPU collision path, which needs a window
+    for columns in (100, 1_000, 4_000):
+        walls = make_physics_world(columns, crate_every=6)
+        t_arcade = run_physics(arcade.PhysicsEnginePlatformer, walls, script, 600)[1] / 600
+        t_grid = run_physics(main.GridPhysicsEngine, walls, script, 600)[1] / 600
+        print(f"{columns:7d} {len(walls[0]):7d} {t_arcade * 1e6:16.1f} {t_grid * 1e6:14.1f}")
+
+
+def bench_culling():
+    frames = 600
+
+    print("LEVEL  sprites  layer draws  chunk draws  sprites drawn  chunk update(us/frame)")
+    for level in (1, 3, 6):
+        view = main.GameView(headless=True, run_seed=3)
+        view.LEVEL = level
+        view.setup()
+        layers = [sprite_list for sprite_list, _ in view.chunks.layers]
+        # Pan the camera across the whole map, one position per frame
+        positions = [(view.map_width * i / frames, view.map_height / 2) for i in range(frames)]
+        submitted = []
+
+        def pan():
+            for position in positions:
+                view.camera.position = position
+                view.player_sprite.position = position
+                view.update_chunks()
+
+        t_update = timed(pan) / frames
+        for position in positions[::10]:
+            view.camera.position = view.player_sprite.position = position
+            view.update_chunks()
+            submitted.append(view.chunks.submitted())
+        draw_calls = sum(calls for calls, _ in submitted) / len(submitted)
+        sprites = sum(count for _, count in submitted) / len(submitted)
+        print(f"{level:5d} {sum(len(layer) for layer in layers):8d} {len(layers):12d} {draw_calls:12.1f} "
+              f"{sprites:14.0f} {t_update * 1e6:23.2f}")
+
+    # The bundled maps are only two screens wide, so also pan over long synthetic worlds
+    print()
+    print("columns  sprites  sprites drawn  chunk build(ms)  chunk update(us/frame)")
+    for columns in (100, 1_000, 10_000):
+        tiles = make_platforms(columns)
+        world = main.ChunkedScene([(tiles, True)])
+        half_width = main.WINDOW_WIDTH / 2 + main.CHUNK_MARGIN
+        xs = [columns * TILE_SIZE * i / frames for i in range(frames)]
+        t_build = timed(lambda: main.ChunkedScene([(tiles, True)]), repeat=1)
+        t_update = timed(lambda: [world.update_view(x - half_width, x + half_width) for x in xs]) / frames
+        drawn = []
+        for x in xs[::10]:
+            world.update_view(x - half_width, x + half_width)
+            drawn.append(world.submitted()[1])
+        print(f"{columns:7d} {len(tiles):8d} {sum(drawn) / len(drawn):14.0f} {t_build * 1000:16.1f} {t_update * 1e6:23.2f}")
+
+
+def bench_bake():
+    """Needs a GL context: a display, or ARCADE_HEADLESS=1 for an offscreen (EGL) one."""
+    window = arcade.Window(main.WINDOW_WIDTH, main.WINDOW_HEIGHT, visible=False)
+    frames = 300
+
+    print("LEVEL  baked  draw calls  sprites  bake(ms)  frame(ms)  differing pixels")
+    for level in (1, 3, 6):
+        shots = {}
+        for bake in (False, True):
+            view = main.GameView(run_seed=3, bake_static=bake)
+            window.show_view(view)
+            view.LEVEL = level
+            view.setup()
+            static = [view.scene[name] for name in view.tile_map.sprite_lists if name not in main.PICKUP_LAYERS]
+            t_bake = timed(lambda: main.ChunkedScene([(layer, True) for layer in static]).bake(static, window.ctx), repeat=1) if bake else 0
+            # Pan the camera across the map, one position per frame
+            positions = [(view.map_width * i / frames, view.map_height / 2) for i in range(frames)]
+
+            def draw_frames():
+                for position in positions:
+                    view.camera.position = view.player_sprite.position = position
+                    view.update_chunks()
+                    window.clear()
+                    view.camera.use()
+                    view.chunks.draw()
+                window.ctx.finish()
+
+            t_frame = timed(draw_frames) / frames
+            shots[bake] = arcade.get_image(0, 0, window.width, window.height).convert("RGB")
+            stats = view.chunks.stats
+            # Compare the last frame of the baked run against the unbaked one
+            differing = "" if not bake else sum(
+                1 for a, b in zip(shots[False].getdata(), shots[True].getdata()) if max(abs(x - y) for x, y in zip(a, b)) > 8
+            )
+            print(f"{level:5d} {str(bake):>6s} {stats['draw_calls']:11d} {stats['sprites']:8d} "
+                  f"{t_bake * 1000:9.1f} {t_frame * 1000:10.3f} {differing:>17}")
+    window.close()
+
+
+def bench_render(frames=100):
+    """Game frame time at each render scale, and the scale the controller settles on. Needs a GL context, like bench_bake."""
+    window = arcade.Window(main.WINDOW_WIDTH, main.WINDOW_HEIGHT, visible=False)
+    view = main.GameView(run_seed=3)
+    window.show_view(view)
+    view.setup()
+    positions = [(view.map_width * i / frames, view.map_height / 2) for i in range(frames)]
+
+    def draw_frames():
+        for position in positions:
+            view.camera.position = view.player_sprite.position = position
+            view.update_chunks()
+            # No previous frame time, so the controller doesn't move the scale being measured
+            view.last_frame_time = None
+            view.on_draw()
+        window.ctx.finish()
+
+    print(f"{'scale':>5s} {'buffer':>10s} {'frame(ms)':>10s}")
+    frame_times = {}
+    scale = 1.0
+    while scale >= main.RENDER_SCALE_MIN:
+        view.render_scale.scale = scale
+        frame_times[scale] = timed(draw_frames) / frames
+        width, height = view.renderer.size
+        print(f"{scale:5.3f} {f'{width}x{height}':>10s} {frame_times[scale] * 1000:10.3f}")
+        scale -= main.RENDER_SCALE_STEP
+
+    # Feed the controller this machine's cost per scale, against a budget full scale misses by a third
+    budget = frame_times[1.0] * 0.75
+    controller = main.RenderScaleController(budget=budget)
+    for _ in range(2000):
+        controller.update(frame_times[min(frame_times, key=lambda s: abs(s - controller.scale))])
+    print(f"budget {budget * 1000:.3f} ms: settled at scale {controller.scale:.3f} after {controller.changes} changes")
+    window.close()
+
+
+class EndlessPilot:
+    """Runs right through endless mode, choosing when to jump by simulating the options on a probe sprite.
+
+    A move is either running on for RUN ticks, or a jump after 0 to JUMP_DELAYS ticks that lets go of right
+    for the first 0 to AIR_STOPS ticks of the rise (to get up a tall stack) and lands. One is only taken if
+    there is a safe move from where it ends, so a jump never lands somewhere with no way on.
+    """
+    RUN = 25
+    JUMP_DELAYS = range(0, 25)
+    AIR_STOPS = (0, 6, 12)
+    MAX_TICKS = 150  # a move that has not ended on the ground by then fails
+
+    def __init__(self, view):
+        self.view = view
+        self.probe = arcade.Sprite(view.player_texture_idle)
+        self.engine = main.GridPhysicsEngine(self.probe, [], gravity_constant=view.physics_engine.gravity_constant)
+        self.plan_until = 0
+        self.jump_at = None
+        self.stop = 0
+        self.failures = 0
+
+    def move(self, state, jump_at, stop=0):
+        """Where the probe ends up from state ((x, y), change_y): None if it dies or runs into a wall."""
+        view = self.view
+        probe = self.probe
+        probe.position, probe.change_y = state
+        probe.change_x = view.move_speed
+        self.engine.grid = view.physics_engine.grid  # replaced whenever the view sets up its physics again
+        start_x = probe.center_x
+        end = self.RUN if jump_at is None else jump_at + 1
+        for tick in range(self.MAX_TICKS):
+            if tick == jump_at:
+                if not self.engine.can_jump():
+                    return None
+                probe.change_y = view.jump_speed
+                probe.change_x = 0 if stop else view.move_speed
+            elif jump_at is not None and tick == jump_at + stop:
+                probe.change_x = view.move_speed
+            self.engine.update()
+            if probe.top < 0 or any(tag in main.HAZARD_TAGS for _, tag in view.entity_index.overlapping(probe)):
+                return None
+            if tick >= end + stop and self.engine.can_jump():
+                # Running into a wall is safe but goes nowhere, so a move must keep most of the running speed
+                if probe.center_x - start_x < 0.6 * view.move_speed * (tick + 1):
+                    return None
+                return probe.position, probe.change_y
+        return None
+
+    def moves(self, state):
+        """((jump delay, air stop) or None, end state) for every safe move from state: running on first,
+        then the jumps that get furthest, the ones without an air stop before the rest."""
+        run = self.move(state, None)
+        if run:
+            yield None, run
+        for stop in self.AIR_STOPS:
+            jumps = [((delay, stop), end) for delay in self.JUMP_DELAYS if (end := self.move(state, delay, stop))]
+            yield from sorted(jumps, key=lambda jump: -jump[1][0][0])
+
+    def plan(self, tick):
+        player = self.view.player_sprite
+        for jump, end in self.moves((player.position, player.change_y)):
+            if next(self.moves(end), None):
+                break
+        else:
+            self.failures += 1
+            return
+        if jump is None:
+            self.jump_at, self.plan_until = None, tick + self.RUN // 2
+        else:
+            delay, self.stop = jump
+            self.jump_at, self.plan_until = tick + delay, tick + delay + self.stop + 1
+
+    def control(self, tick):
+        """Send this tick's key events: hold right, and jump (letting go of right for a while) when the plan says so."""
+        view = self.view
+        if tick == 0:
+            view.on_key_press(arcade.key.RIGHT, 0)
+        if self.jump_at is not None:
+            if tick == self.jump_at + 1:
+                view.on_key_release(arcade.key.UP, 0)
+            if self.stop and tick == self.jump_at + self.stop:
+                view.on_key_press(arcade.key.RIGHT, 0)
+        if tick >= self.plan_until and view.physics_engine.can_jump():
+            self.plan(tick)
+        if tick == self.jump_at:
+            if self.stop:
+                view.on_key_release(arcade.key.RIGHT, 0)
+            view.on_key_press(arcade.key.UP, 0)
+
+
+def bench_endless(distance=1_000_000, report_every=100_000):
+    """Soak test: a look-ahead pilot plays an endless world headless for distance px; nothing may grow and it never dies."""
+    view = main.GameView(headless=True, run_seed=3, physics="grid", endless=True)
+    view.setup()
+    player = view.player_sprite
+    pilot = EndlessPilot(view)
+
+    print("distance(px)  ticks/s  chunks  sprites  scene  index  grid  gc objects  blocks  LEVEL")
+    rows = []
+    tick = ticks = 0
+    lives = view.lives
+    best_x = stuck_since = 0
+    next_report = report_every
+    stepping = 0
+    while best_x < distance:
+        view.sounds.end_frame()
+        pilot.control(ticks)
+        start = time.perf_counter()
+        view.step()
+        stepping += time.perf_counter() - start
+        tick += 1
+        ticks += 1
+        # Every chunk is validated, so the whole world must be playable
+        assert not pilot.failures, f"no safe move at x={player.center_x:.0f}"
+        assert view.lives >= lives, f"died at x={player.center_x:.0f}"
+        lives = view.lives
+        if player.center_x > best_x + 64:
+            best_x, stuck_since = player.center_x, ticks
+        assert ticks - stuck_since <= 600, f"stuck at x={best_x:.0f}"
+        if best_x >= next_report:
+            ticks_per_second = tick / stepping
+            # The run's input log grows with play time by design, so drop it to measure the world alone
+            view.recording.events.clear()
+            view.recording.checks.clear()
+            gc.collect()
+            counts = (len(view.world.chunks), view.world.sprite_count(),
+                      sum(len(view.scene[name]) for name in view.scene_layer_names),
+                      len(view.entity_index), len(view.physics_engine.grid.indices), len(gc.get_objects()))
+            blocks = sys.getallocatedblocks()
+            print(f"{next_report:12d} {ticks_per_second:8.0f} {counts[0]:7d} {counts[1]:8d} {counts[2]:6d} {counts[3]:6d} "
+                  f"{counts[4]:5d} {counts[5]:11d} {blocks:7d} {view.LEVEL:6d}")
+            rows.append((counts, blocks))
+            next_report += report_every
+            tick = 0
+            stepping = 0
+    print(f"chunks generated {view.world.generated}, evicted {view.world.evicted}")
+
+    # Everything live is bounded by the chunks around the camera, so the counts only wobble
+    # with the terrain: the second half of the run never goes far past the first half's peak
+    half = len(rows) // 2
+    peak_counts = [max(column) for column in zip(*(counts for counts, _ in rows[:half]))]
+    peak_blocks = max(blocks for _, blocks in rows[:half])
+    for counts, blocks in rows[half:]:
+        assert all(count <= 1.5 * peak for count, peak in zip(counts, peak_counts)), counts
+        assert blocks <= 1.1 * peak_blocks, blocks
+
+
+def bench_snapshot(ticks=600, repeat=20000):
+    """Snapshot/restore cost and rewind memory, checking a quick-load replays identically."""
+    def play(view, script, first, count):
+        states = []
+        for tick in range(first, first + count):
+            script.apply(view, tick)
+            view.step()
+            player = view.player_sprite
+            states.append((player.center_x, player.center_y, player.change_x, player.change_y,
+                           view.score, view.lives, tuple(view.alive)))
+        return states
+
+    for physics in ("arcade", "grid"):
+        view = main.GameView(headless=True, run_seed=5, physics=physics)
+        view.LEVEL = 3
+        view.setup()
+        script = main.ScriptedInput.run_right(4 * ticks)
+        play(view, script, 0, ticks // 3)
+        view.take_quick_save()
+        first = play(view, script, ticks // 3, ticks)
+        view.load_quick_save()
+        again = play(view, script, ticks // 3, ticks)
+        assert first == again, f"{physics}: quick-load diverged"
+
+        # Rewinding n steps lands on the state n steps back
+        view.rewinding = True
+        for _ in range(ticks // 2):
+            view.step()
+        view.rewinding = False
+        player = view.player_sprite
+        assert (player.center_x, player.center_y, view.score) == first[ticks // 2 - 1][:2] + first[ticks // 2 - 1][4:5]
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            view.history.push(*view.snapshot())
+        push_us = (time.perf_counter() - start) / repeat * 1e6
+        start = time.perf_counter()
+        for _ in range(repeat):
+            view.restore_snapshot(*view.quick_save)
+        restore_us = (time.perf_counter() - start) / repeat * 1e6
+        per_second = view.history.nbytes / main.REWIND_SECONDS
+        print(f"{physics:7s} snapshot {push_us:5.2f} us | restore {restore_us:5.2f} us | "
+              f"{per_second / 1024:.1f} KiB per second of history ({len(view.items)} pickups tracked)")
+
+
+def bench_pool(transitions=30, seed=3):
+    """Level changes and restarts with and without SPRITE_POOL: time, sprites built, GC pauses, old scenes freed."""
+    pauses = []
+    def on_gc(phase, info):
+        if phase == "start":
+            pauses.append(time.perf_counter())
+        else:
+            pauses[-1] = time.perf_counter() - pauses[-1]
+    gc.callbacks.append(on_gc)
+
+    try:
+        for pooling in (False, True):
+            main.POOL_SPRITES = pooling
+            main.SPRITE_POOL = main.SpritePool()
+            gc.collect()
+            pauses.clear()
+            freed = 0
+            times = []
+            # Levels past the last map print a notice as they fall back to level 1's map
+            with contextlib.redirect_stdout(io.StringIO()):
+                view = main.GameView(headless=True, run_seed=seed)
+                view.setup()
+                for i in range(transitions):
+                    start = time.perf_counter()
+                    if i % 5 == 4:
+                        # A restart, as GameOverView does it
+                        view.release_scene()
+                        view = main.GameView(headless=True, run_seed=seed)
+                        view.setup()
+                    else:
+                        view.level += 1
+                        view.LEVEL += 1
+                        view.setup()
+                    times.append(time.perf_counter() - start)
+                    freed += view.memory_stats()["released_scene_freed"]
+                # Clearing the lists breaks the sprite <-> list cycles: no collection needed to free them
+                gc.disable()
+                view.level += 1
+                view.LEVEL += 1
+                view.setup()
+                assert view.memory_stats()["released_scene_freed"], "old scene waits for the garbage collector"
+                gc.enable()
+            times.sort()
+            stats = view.memory_stats()
+            print(f"pooling {'on ' if pooling else 'off'} | transition p50 {times[len(times) // 2] * 1000:5.1f} ms, "
+                  f"max {times[-1] * 1000:5.1f} ms | sprites built {main.SPRITE_POOL.created:4d}, reused {main.SPRITE_POOL.reused:4d} | "
+                  f"GC passes {len(pauses):3d}, {sum(pauses) * 1000:6.1f} ms | old scenes freed {freed}/{transitions}")
+        print("live sprites per layer: " + ", ".join(f"{name} {count}" for name, count in stats["layers"].items()))
+        print(f"spare sprites: {stats['pool']['free']}")
+    finally:
+        gc.callbacks.remove(on_gc)
+        main.POOL_SPRITES = True
+
+
+def bench_entities(counts=(1_000, 10_000, 100_000), seed=0):
+    """Per-tick motion + player overlap + sprite sync: an EntityStore against moving each sprite in Python."""
+    rng = random.Random(seed)
+    textures = main.ASSETS.entities()
+    kinds = list(main.ENTITY_KINDS)
+    player = arcade.Sprite(main.ASSETS.character(main.CHARACTERS[0])["idle"], center_x=5000, center_y=500)
+    print(f"{'entities':>8s} {'store ms':>9s} {'per-sprite ms':>14s} {'speedup':>8s} {'hits':>5s}")
+    for count in counts:
+        sprite_list = arcade.SpriteList()
+        store = main.EntityStore()
+        movers = []
+        rows = []
+        for _ in range(count):
+            kind = rng.choice(kinds)
+            texture, scale, box = textures[kind]
+            _, _, _, motion, amplitude, period, _ = main.ENTITY_KINDS[kind]
+            origin_x, origin_y, phase = rng.uniform(0, 10_000), rng.uniform(0, 1000), rng.random()
+            sprite = arcade.Sprite(texture, scale, origin_x, origin_y)
+            movers.append((sprite, motion, origin_x, origin_y, amplitude, period, phase))
+            rows.append((kinds.index(kind), motion, origin_x, origin_y, box, amplitude, period, phase))
+        kind_codes, motions, origin_xs, origin_ys, boxes, amplitudes, periods, phases = zip(*rows)
+        store.add_many(kind_codes, motions, origin_xs, origin_ys, boxes, amplitudes, periods, phases,
+                       sprites=[mover[0] for mover in movers], sprite_list=sprite_list)
+
+        def store_tick():
+            store.update()
+            hits = store.overlapping(player.left, player.bottom, player.right, player.top)
+            store.sync(sprite_list)
+            return hits
+
+        def sprite_tick(t):
+            for sprite, motion, origin_x, origin_y, amplitude, period, phase in movers:
+                if motion == main.MOTION_BOB:
+                    sprite.center_y = origin_y + amplitude * math.sin(2 * math.pi * (t / period + phase))
+                else:
+                    cycle = (t / period + phase) % 1
+                    sprite.center_x = origin_x + amplitude * (1 - abs(1 - 2 * cycle))
+            # method 3: the CPU test (larger lists would otherwise go to the GPU)
+            return arcade.check_for_collision_with_list(player, sprite_list, method=3)
+
+        ticks = max(3, 20_000 // count)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            store_hits = store_tick()
+        store_ms = (time.perf_counter() - start) / ticks * 1000
+
+        start = time.perf_counter()
+        for _ in range(ticks):
+            sprite_hits = sprite_tick(store.time)
+        sprite_ms = (time.perf_counter() - start) / ticks * 1000
+
+        # Same clock, same places; the store tests hit box extents, a superset of the exact polygons
+        data = np.frombuffer(sprite_list._sprite_pos_angle_data, dtype=np.float32).reshape(-1, 4)
+        stored = data[store.slot[:count], :2].copy()
+        del data
+        assert np.allclose(stored, [sprite.position for sprite, *_ in movers], atol=1e-2)
+        assert {movers[row][0] for row in store_hits} >= set(sprite_hits)
+        print(f"{count:8d} {store_ms:9.3f} {sprite_ms:14.3f} {sprite_ms / store_ms:7.1f}x {len(store_hits):5d}")
+
+
+def bench_views(repeat=10, seed=3):
+    """Pause, resume and restart latency to the next view's first frame: rebuilding views against ViewRegistry. Needs a GL context."""
+    window = arcade.Window(main.WINDOW_WIDTH, main.WINDOW_HEIGHT, visible=False)
+
+    def first_frame(switch):
+        start = time.perf_counter()
+        switch()
+        window.current_view.on_draw()
+        window.ctx.finish()
+        return (time.perf_counter() - start) * 1000
+
+    # The old lifecycle: a new MenuView per pause, a new GameView (and UIManager) per restart
+    def rebuild_game():
+        view = main.GameView(character_data=main.CHARACTERS[0], run_seed=seed)
+        view.setup()
+        window.show_view(view)
+
+    rebuilt = {"pause": [], "resume": [], "restart": []}
+    rebuild_game()
+    for _ in range(repeat):
+        game = window.current_view
+        rebuilt["pause"].append(first_frame(lambda: window.show_view(main.MenuView(game))))
+        rebuilt["resume"].append(first_frame(lambda: window.show_view(game)))
+        game.release_scene()
+        rebuilt["restart"].append(first_frame(rebuild_game))
+
+    main.VIEWS = views = main.ViewRegistry()
+    views.play(main.CHARACTERS[0], seed)
+    window.current_view.on_draw()
+    game = views.views["game"]
+    reused = {"pause": [], "resume": [], "restart": []}
+    for _ in range(repeat):
+        reused["pause"].append(first_frame(lambda: views.pause(game)))
+        reused["resume"].append(first_frame(lambda: views.resume(game)))
+        reused["restart"].append(first_frame(lambda: views.play(main.CHARACTERS[0], seed, transition="restart")))
+    window.close()
+
+    print(f"{'transition':10s} {'rebuilt p50':>12s} {'max':>7s} {'registry p50':>13s} {'max':>7s}")
+    for transition in rebuilt:
+        old = sorted(rebuilt[transition])
+        new = sorted(reused[transition])
+        print(f"{transition:10s} {old[len(old) // 2]:10.1f}ms {old[-1]:5.1f}ms {new[len(new) // 2]:11.1f}ms {new[-1]:5.1f}ms")
+    print("ViewRegistry's own timings (ms): " + ", ".join(
+        f"{transition} {p50:.1f} median" for transition, (_, p50, _) in views.stats().items()))
+
+
+# Run in a fresh interpreter per measurement, so nothing is imported or cached yet
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import arcade, arcade.gui, numpy, pyglet.media
+dependencies = time.perf_counter()
+import main
+imported = time.perf_counter()
+window = arcade.Window(main.WINDOW_WIDTH, main.WINDOW_HEIGHT, main.WINDOW_TITLE)
+opened = time.perf_counter()
+loading = main.LoadingView()
+window.show_view(loading)
+loading.on_draw()
+window.flip()
+first_frame = time.perf_counter()
+while window.current_view is loading:
+    window.dispatch_events()
+    loading.on_update(1 / 60)
+    if window.current_view is loading:
+        loading.on_draw()
+        window.flip()
+window.current_view.on_draw()
+window.flip()
+menu = time.perf_counter()
+print(json.dumps({
+    "dependencies": dependencies - start,
+    "import main": imported - dependencies,
+    "window": opened - imported,
+    "first frame": first_frame - start,
+    "menu": menu - start,
+    "steps": loading.step_times,
+}))
+"""
+# Regression budgets in seconds: main's own import (past arcade, numpy and pyglet), and
+# the first frame and the interactive menu, both counted from interpreter start
+STARTUP_BUDGETS = {"import main": 0.1, "first frame": 1.5, "menu": 2.5}
+
+
+def bench_startup(runs=3):
+    """Import time and time to first frame and to the menu. Needs a GL context, like bench_bake."""
+    best = {}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        steps = result.pop("steps")
+        for name, seconds in result.items():
+            best[name] = min(best.get(name, float("inf")), seconds)
+    for name, seconds in best.items():
+        budget = STARTUP_BUDGETS.get(name)
+        print(f"{name:14s} {seconds * 1000:7.1f} ms" + (f"  (budget {budget * 1000:.0f} ms)" if budget else ""))
+    print("loading steps: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in steps.items()))
+    for name, budget in STARTUP_BUDGETS.items():
+        assert best[name] <= budget, f"{name} took {best[name] * 1000:.0f} ms, over its {budget * 1000:.0f} ms budget"
+
+
+def bench_vector(envs_per_worker=8, steps=500, seed=0):
+    """Aggregate steps/s of a VectorEnv playing random actions, for 1 worker up to one per CPU."""
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, cpus} | {n for n in (2, 4, 8, 16, 32, 64) if n < cpus})
+    rng = np.random.default_rng(seed)
+    baseline = None
+    print(f"{'workers':>7s} {'envs':>5s} {'steps/s':>9s} {'ticks/s':>9s} {'scaling':>8s} {'episodes':>8s}")
+    for workers in counts:
+        num_envs = workers * envs_per_worker
+        with env.VectorEnv(num_envs, workers=workers, physics="grid", frame_skip=4, max_steps=400) as envs:
+            envs.reset(seed)
+            start = time.perf_counter()
+            for _ in range(steps):
+                envs.step(rng.integers(len(env.ENV_ACTIONS), size=num_envs))
+            elapsed = time.perf_counter() - start
+            steps_per_second = num_envs * steps / elapsed
+            baseline = baseline or steps_per_second
+            print(f"{workers:7d} {num_envs:5d} {steps_per_second:9.0f} {4 * steps_per_second:9.0f} "
+                  f"{steps_per_second / baseline:7.2f}x {len(envs.episodes):8d}")
+
+
+BENCHMARKS = {
+    "heightmap": bench_heightmap,
+    "assets": bench_assets,
+    "spawn": bench_spawn,
+    "collisions": bench_collisions,
+    "physics": bench_physics,
+    "culling": bench_culling,
+    "bake": bench_bake,
+    "render": bench_render,
+    "endless": bench_endless,
+    "vector": bench_vector,
+    "snapshot": bench_snapshot,
+    "startup": bench_startup,
+    "pool": bench_pool,
+    "entities": bench_entities,
+    "views": bench_views,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"--- {name} ---")
+        BENCHMARKS[name]()
@@ -0,0 +1,161 @@
+"""
+Bot environments for the platformer game: GameEnv and VectorEnv
+"""
+import math
+import multiprocessing
+import os
+import sys
+
+import arcade
+import numpy as np
+
+import main
+
+# Actions as (horizontal direction, jump) for GameEnv.step
+ENV_ACTIONS = ((0, False), (-1, False), (1, False), (0, True), (-1, True), (1, True))
+# Fields of an observation row, in order
+ENV_OBSERVATION = ("x", "y", "change_x", "change_y", "on_ground", "progress", "score", "lives", "level")
+
+
+class GameEnv:
+    """A headless GameView behind reset(seed)/step(action); actions become key presses, so runs stay replayable."""
+    def __init__(self, character=0, physics="arcade", level=1, endless=False, base_rates=main.BASE_SPAWN_RATES,
+                 frame_skip=4, max_steps=5000):
+        self.character = character
+        self.physics = physics
+        self.level = level
+        self.endless = endless
+        self.base_rates = base_rates
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.view = None
+        self.steps = 0
+        self.direction = 0
+
+    def reset(self, seed=None):
+        """Start a new run with run seed `seed` and return its first observation."""
+        if self.view is None:
+            self.view = main.GameView(character_data=main.CHARACTERS[self.character], headless=True, physics=self.physics)
+            self.view.BASE_CRATE, self.view.BASE_COIN, self.view.BASE_BOMB, self.view.BASE_GEM, self.view.BASE_CHECK = self.base_rates
+        self.view.reset(run_seed=seed, endless=self.endless, start_level=self.level)
+        self.steps = 0
+        self.direction = 0
+        return self.observation()
+
+    def step(self, action):
+        """Apply one action, simulate frame_skip steps and return (observation, score, lives, done)."""
+        view = self.view
+        direction, jump = ENV_ACTIONS[action]
+        if direction != self.direction:
+            # Releasing either arrow stops the player, so release first and press the new one
+            if self.direction:
+                view.on_key_release(arcade.key.RIGHT if self.direction > 0 else arcade.key.LEFT, 0)
+            if direction:
+                view.on_key_press(arcade.key.RIGHT if direction > 0 else arcade.key.LEFT, 0)
+            self.direction = direction
+        elif direction and view.player_sprite.change_x == 0:
+            # Respawning stops the player: press the held arrow again
+            view.on_key_press(arcade.key.RIGHT if direction > 0 else arcade.key.LEFT, 0)
+        if jump:
+            view.on_key_press(arcade.key.UP, 0)
+            view.on_key_release(arcade.key.UP, 0)
+
+        for _ in range(self.frame_skip):
+            if view.game_over:
+                break
+            view.sounds.end_frame()
+            view.step()
+        self.steps += 1
+        done = view.game_over or self.steps >= self.max_steps
+        return self.observation(), view.score, view.lives, done
+
+    def observation(self):
+        """The current state as a float32 row of ENV_OBSERVATION fields."""
+        view = self.view
+        player = view.player_sprite
+        progress = player.center_x / view.map_width if math.isfinite(view.map_width) else 0.0
+        return np.array((player.center_x, player.center_y, player.change_x, player.change_y,
+                         view.physics_engine.can_jump(), progress, view.score, view.lives, view.LEVEL), dtype=np.float32)
+
+    def summary(self):
+        """Outcome of the current episode, as in Recording.outcome_of plus the run seed."""
+        outcome = main.Recording.outcome_of(self.view)
+        outcome["seed"] = self.view.run_seed
+        return outcome
+
+
+def env_worker(connection, env_kwargs, count, quiet=True):
+    """Serve `count` GameEnvs over a pipe: ("reset", seeds), ("step", actions) and ("close", None)."""
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+    envs = [GameEnv(**env_kwargs) for _ in range(count)]
+    seeds = [0] * count
+    seed_stride = 0
+    while True:
+        command, data = connection.recv()
+        if command == "reset":
+            seeds, seed_stride = data
+            connection.send(np.stack([env.reset(seed) for env, seed in zip(envs, seeds)]))
+        elif command == "step":
+            observations = np.empty((count, len(ENV_OBSERVATION)), dtype=np.float32)
+            scores = np.empty(count, dtype=np.int64)
+            lives = np.empty(count, dtype=np.int64)
+            dones = np.empty(count, dtype=bool)
+            finished = []
+            for i, (env, action) in enumerate(zip(envs, data)):
+                observations[i], scores[i], lives[i], dones[i] = env.step(action)
+                if dones[i]:
+                    finished.append(env.summary())
+                    seeds[i] += seed_stride
+                    observations[i] = env.reset(seeds[i])
+            connection.send((observations, scores, lives, dones, finished))
+        elif command == "close":
+            connection.close()
+            return
+
+
+class VectorEnv:
+    """num_envs GameEnvs sharded across worker processes and stepped in lockstep; finished episodes reset themselves."""
+    def __init__(self, num_envs, workers=None, **env_kwargs):
+        workers = min(workers or os.cpu_count() or 1, num_envs)
+        self.num_envs = num_envs
+        self.shards = [len(shard) for shard in np.array_split(np.arange(num_envs), workers)]
+        self.bounds = np.cumsum([0] + self.shards)
+        self.episodes = []
+        self.connections = []
+        self.processes = []
+        for count in self.shards:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=env_worker, args=(child, env_kwargs, count), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self, seed=0):
+        """Reset every env, env i with run seed seed + i. Returns observations, one row per env."""
+        for connection, first, last in zip(self.connections, self.bounds, self.bounds[1:]):
+            connection.send(("reset", (list(range(seed + first, seed + last)), self.num_envs)))
+        return np.concatenate([connection.recv() for connection in self.connections])
+
+    def step(self, actions):
+        """Apply one action per env. Returns (observations, scores, lives, dones) arrays."""
+        for connection, first, last in zip(self.connections, self.bounds, self.bounds[1:]):
+            connection.send(("step", actions[first:last]))
+        results = [connection.recv() for connection in self.connections]
+        for *_, finished in results:
+            self.episodes.extend(finished)
+        return tuple(np.concatenate([result[i] for result in results]) for i in range(4))
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -4,7 +4,21 @@ Author: Bradley Kibwana
 """
 import arcade
 import arcade.gui
+import numpy as np
+import pyglet.media
+import argparse
+import json
+import math
+import os
 import random
+import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Constants & Configuration ---
 WINDOW_WIDTH = 1280
@@ -12,10 +26,62 @@ WINDOW_HEIGHT = 720
 WINDOW_TITLE = "Adventures of the Platformer"
 TILE_SCALING = 0.5
 COIN_SCALING = 0.5
+# Speeds, gravity and the camera lerp are per simulation step at TUNED_RATE steps/s
 PLAYER_MOVEMENT_SPEED = 5
 GRAVITY = 1
 PLAYER_JUMP_SPEED = 20
 CAMERA_SPEED = 0.1
+TUNED_RATE = 60
+SIMULATION_RATE = 60
+MAX_CATCH_UP_STEPS = 5
+ASSET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LEVEL_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# Recycle item and streamed terrain sprites through SPRITE_POOL, keeping up to this many spare per kind
+POOL_SPRITES = True
+POOL_MAX_FREE = 4096
+CHUNK_WIDTH = 1024
+CHUNK_MARGIN = 256
+BAKE_STATIC_LAYERS = False
+# Endless mode: difficulty goes up every ENDLESS_CHUNKS_PER_LEVEL chunks, terrain is generated
+# this far past the camera's right edge and the camera never rises above ENDLESS_HEIGHT
+ENDLESS_CHUNKS_PER_LEVEL = 3
+ENDLESS_LOOKAHEAD = 1024
+ENDLESS_HEIGHT = 1280
+# Moving hazards and gems per map level, rolled from the level seed
+MOVERS_PER_LEVEL = 4
+# Check every generated map layout can be played through and repair it if not
+VALIDATE_LEVELS = True
+# Item percentages at LEVEL 1: crate, coin, bomb, gem, check
+BASE_SPAWN_RATES = (20, 15, 10, 5, 5)
+# Smallest player hit box across CHARACTERS (narrowest and shortest), in px
+PLAYER_HITBOX_SIZE = (64, 91)
+# Every run's input is recorded in memory; with RECORD_RUNS (or --save-recordings), finished runs
+# (game over) are saved here for replay
+RECORD_RUNS = False
+RECORDINGS_DIR = "recordings"
+RECORDING_CHECK_INTERVAL = 60
+VOICES_PER_EFFECT = 4
+# Frame profiler: spans kept in the ring buffer, and how often the overlay recomputes
+PROFILER_CAPACITY = 16384
+PROFILER_REFRESH_FRAMES = 30
+# Adaptive render resolution: the game camera draws off-screen at a fraction of the window's
+# resolution, stepped down while the slow end of the last RENDER_SCALE_WINDOW frames is over
+# RENDER_FRAME_BUDGET and back up once frames have stayed within it for a while
+ADAPTIVE_RESOLUTION = True
+RENDER_FRAME_BUDGET = 1 / 60
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_STEP = 0.125
+RENDER_SCALE_WINDOW = 30
+# Longest a frame of the loading screen spends on startup steps, in seconds
+LOADING_FRAME_BUDGET = 1 / 30
+# Rewind history kept (a snapshot per simulation step), and its keys
+REWIND_SECONDS = 10
+REWIND_KEY = arcade.key.BACKSPACE
+QUICK_SAVE_KEY = arcade.key.F5
+QUICK_LOAD_KEY = arcade.key.F9
+# Keys that change the simulation, and so the only ones a recording keeps (not F3/F4, the profiler's)
+SIMULATION_KEYS = frozenset({arcade.key.UP, arcade.key.W, arcade.key.LEFT, arcade.key.A, arcade.key.RIGHT,
+                             arcade.key.D, REWIND_KEY, QUICK_SAVE_KEY, QUICK_LOAD_KEY})
 
 # --- Scores ---
 SCORE_BRONZE = 10
@@ -32,25 +98,10 @@ COLOR_BTN_HOVER = arcade.color.SANDY_BROWN
 COLOR_BTN_PRESS = arcade.color.SIENNA
 COLOR_BTN_TEXT = arcade.color.DARK_BROWN
 
-# Load Retro Font
-arcade.load_font(':resources:/fonts/ttf/Kenney/Kenney_Pixel.ttf')
+# Retro Font: loaded on first use (ASSETS.font), along with the button style built from it
+RETRO_FONT_PATH = ':resources:/fonts/ttf/Kenney/Kenney_Pixel.ttf'
 RETRO_FONT = "Kenney Pixel"
 
-RETRO_BUTTON_STYLE = {
-    "normal": arcade.gui.UIFlatButton.UIStyle(
-        font_size=24, font_name=RETRO_FONT, font_color=COLOR_BTN_TEXT,
-        bg=COLOR_BTN_NORMAL, border=COLOR_BTN_PRESS, border_width=2,
-    ),
-    "hover": arcade.gui.UIFlatButton.UIStyle(
-        font_size=24, font_name=RETRO_FONT, font_color=COLOR_BTN_TEXT,
-        bg=COLOR_BTN_HOVER, border=COLOR_BTN_TEXT, border_width=2,
-    ),
-    "press": arcade.gui.UIFlatButton.UIStyle(
-        font_size=24, font_name=RETRO_FONT, font_color=arcade.color.WHITE,
-        bg=COLOR_BTN_PRESS, border=COLOR_BTN_PRESS, border_width=2,
-    ),
-}
-
 # --- Character Options Configuration ---
 # Maps a display name to {folder_name, file_prefix}
 # Example: 'male_person' folder contains 'malePerson_idle.png'
@@ -62,6 +113,1751 @@ CHARACTERS = [
     {"name": "Adventurer", "path": "female_adventurer", "prefix": "femaleAdventurer"},
 ]
 
+# --- Procedural Items ---
+# Maps an item kind to (texture, scale, scene layer)
+ITEMS = {
+    "crate": (":resources:images/tiles/boxCrate_double.png", TILE_SCALING, "Obstacles"),
+    "coin_bronze": (":resources:/images/items/coinBronze.png", COIN_SCALING, "Coins_Bronze"),
+    "coin_silver": (":resources:/images/items/coinSilver.png", COIN_SCALING, "Coins_Silver"),
+    "bomb": (":resources:images/tiles/bomb.png", TILE_SCALING, "Bombs"),
+    "gem": (":resources:/images/items/gemRed.png", COIN_SCALING, "Gems"),
+    "key": (":resources:/images/items/keyBlue.png", COIN_SCALING, "Keys"),
+}
+# Endless mode terrain tiles
+TERRAIN = {
+    "top": ":resources:images/tiles/grassMid.png",
+    "fill": ":resources:images/tiles/grassCenter.png",
+}
+# Scene layers added on top of the map for generated items, in draw order
+ITEM_LAYERS = ["Coins_Bronze", "Coins_Silver", "Gems", "Keys", "Obstacles", "Bombs"]
+
+
+# --- Collision Tags ---
+# Scene layers checked against the player, mapped to the tag whose effect they trigger.
+# Effects are applied in this order.
+PICKUP_LAYERS = {
+    "Bombs": "bomb",
+    "Don't Touch": "hazard",
+    "Coins": "coin_gold",
+    "Coins_Bronze": "coin_bronze",
+    "Coins_Silver": "coin_silver",
+    "Gems": "gem",
+    "Keys": "key",
+}
+HAZARD_TAGS = ("bomb", "hazard")
+
+# --- Moving Entities ---
+# Motions of an EntityStore entity, as functions of the store's clock t (in steps at TUNED_RATE)
+MOTION_LINEAR = 0  # origin + velocity * t
+MOTION_BOB = 1  # y swings amplitude px either side of the origin, once per period
+MOTION_PATROL = 2  # x walks amplitude px right of the origin and back, once per period
+# Maps a mover kind to (texture, scale, tag, motion, amplitude, period, height above the ground)
+ENTITY_KINDS = {
+    "slime": (":resources:images/enemies/slimeBlue.png", TILE_SCALING, "hazard", MOTION_PATROL, 192, 300, 0),
+    "saw": (":resources:images/enemies/saw.png", TILE_SCALING, "hazard", MOTION_PATROL, 256, 240, 0),
+    "bee": (":resources:images/enemies/bee.png", TILE_SCALING, "hazard", MOTION_BOB, 64, 120, 160),
+    "blue_gem": (":resources:/images/items/gemBlue.png", COIN_SCALING, "gem", MOTION_BOB, 16, 90, 120),
+}
+ENTITY_LAYER = "Movers"
+
+
+class Heightmap:
+    """Column-indexed surface tops of a tile layer, built once per map load."""
+    def __init__(self, tiles, column_width, default_y=-100):
+        self.column_width = column_width
+        self.default_y = default_y
+        # Per tile column: (top, left, right) sorted by top
+        self.columns = {}
+
+        for tile in tiles:
+            first = int(tile.left // column_width)
+            last = int(math.ceil(tile.right / column_width)) - 1
+            for col in range(first, last + 1):
+                self.columns.setdefault(col, []).append((tile.top, tile.left, tile.right))
+
+        for entries in self.columns.values():
+            entries.sort()
+
+    def ground_y(self, x_pos):
+        """Highest surface top directly over x_pos (same rule as a full scan of the layer)."""
+        entries = self.columns.get(int(x_pos // self.column_width))
+        if entries:
+            for top, left, right in reversed(entries):
+                if left < x_pos < right:
+                    return top
+        return self.default_y
+
+
+class EntityIndex:
+    """Uniform grid of static pickups and hazards, each tagged with the effect it triggers."""
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> {sprite: order}
+        self.entries = {}  # sprite -> (tag, order, cells)
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cells_for(self, sprite):
+        # The full texture rectangle is a cheap superset of the hit box
+        size = self.cell_size
+        x, y = sprite.position
+        half_w = sprite.width / 2
+        half_h = sprite.height / 2
+        return [
+            (cx, cy)
+            for cx in range(int((x - half_w) // size), int((x + half_w) // size) + 1)
+            for cy in range(int((y - half_h) // size), int((y + half_h) // size) + 1)
+        ]
+
+    def add(self, sprite, tag, order=None):
+        """Index sprite; order (its place in overlap results) defaults to after everything so far."""
+        cells = self._cells_for(sprite)
+        if order is None:
+            order = self.next_order
+            self.next_order += 1
+        self.entries[sprite] = (tag, order, cells)
+        for cell in cells:
+            self.cells.setdefault(cell, {})[sprite] = order
+
+    def add_layers(self, scene, layer_tags):
+        """Index every sprite of the scene layers in layer_tags ({layer name: tag}), in that order."""
+        for layer, tag in layer_tags.items():
+            if layer in scene:
+                for sprite in scene[layer]:
+                    self.add(sprite, tag)
+
+    def remove(self, sprite):
+        entry = self.entries.pop(sprite, None)
+        if entry is None:
+            return
+        for cell in entry[2]:
+            bucket = self.cells[cell]
+            del bucket[sprite]
+            if not bucket:
+                del self.cells[cell]
+
+    def overlapping(self, sprite):
+        """(sprite, tag) pairs whose hit boxes touch sprite, in insertion order."""
+        candidates = {}
+        for cell in self._cells_for(sprite):
+            bucket = self.cells.get(cell)
+            if bucket:
+                candidates.update(bucket)
+        if not candidates:
+            return []
+
+        hits = []
+        for other, order in sorted(candidates.items(), key=lambda item: item[1]):
+            if arcade.check_for_collision(sprite, other):
+                hits.append((other, self.entries[other][0]))
+        return hits
+
+
+class EntityStore:
+    """Moving pickups and hazards as a struct of NumPy arrays, moved, hit-tested and synced to sprites all at once."""
+    FLOAT_FIELDS = ("x", "y", "vx", "vy", "origin_x", "origin_y", "amplitude", "period", "phase",
+                    "box_left", "box_bottom", "box_right", "box_top")
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.time = 0.0
+        for name in self.FLOAT_FIELDS:
+            setattr(self, name, np.zeros(capacity))
+        self.kind = np.zeros(capacity, dtype=np.int16)
+        self.motion = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.slot = np.full(capacity, -1, dtype=np.int64)
+        self.sprites = []
+        self.motion_rows = None  # motion -> row indices, rebuilt after adds
+        self.sync_rows = None  # (rows, slots) of live entities with a sprite, rebuilt on changes
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self.FLOAT_FIELDS + ("kind", "motion", "alive", "slot"):
+            old = getattr(self, name)
+            new = np.full(capacity, -1, dtype=old.dtype) if name == "slot" else np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add_many(self, kinds, motions, origin_x, origin_y, boxes, amplitude=0, period=1, phase=0,
+                 velocity=(0, 0), sprites=None, sprite_list=None):
+        """Append len(kinds) entities (boxes are hit box offsets from the centre) and return their rows."""
+        count = len(kinds)
+        start = self.size
+        self._grow(start + count)
+        rows = slice(start, start + count)
+        self.kind[rows] = kinds
+        self.motion[rows] = motions
+        self.origin_x[rows] = origin_x
+        self.origin_y[rows] = origin_y
+        self.x[rows] = origin_x
+        self.y[rows] = origin_y
+        self.vx[rows], self.vy[rows] = velocity
+        self.amplitude[rows] = amplitude
+        self.period[rows] = period
+        self.phase[rows] = phase
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.box_left[rows], self.box_bottom[rows], self.box_right[rows], self.box_top[rows] = boxes.T
+        self.alive[rows] = True
+        if sprites is not None:
+            for sprite in sprites:
+                # Pooled sprites may have been hidden as dead entities of an earlier store
+                if not sprite.visible:
+                    sprite.visible = True
+            sprite_list.extend(sprites)
+            self.slot[rows] = [sprite_list.sprite_slot[sprite] for sprite in sprites]
+            self.sprites.extend(sprites)
+        self.size += count
+        self.motion_rows = None
+        self.sync_rows = None
+        self.update(0)
+        return np.arange(start, start + count)
+
+    def update(self, dt=1):
+        """Advance the clock by dt steps and move every entity to its place at the new time."""
+        self.time += dt
+        t = self.time
+        if self.motion_rows is None:
+            motion = self.motion[:self.size]
+            self.motion_rows = {m: np.flatnonzero(motion == m) for m in (MOTION_LINEAR, MOTION_BOB, MOTION_PATROL)}
+
+        rows = self.motion_rows[MOTION_LINEAR]
+        if len(rows):
+            self.x[rows] = self.origin_x[rows] + self.vx[rows] * t
+            self.y[rows] = self.origin_y[rows] + self.vy[rows] * t
+        rows = self.motion_rows[MOTION_BOB]
+        if len(rows):
+            self.y[rows] = self.origin_y[rows] + self.amplitude[rows] * np.sin(
+                2 * np.pi * (t / self.period[rows] + self.phase[rows]))
+        rows = self.motion_rows[MOTION_PATROL]
+        if len(rows):
+            cycle = t / self.period[rows] + self.phase[rows]
+            self.x[rows] = self.origin_x[rows] + self.amplitude[rows] * (1 - np.abs(1 - 2 * (cycle % 1)))
+
+    def overlapping(self, left, bottom, right, top):
+        """Rows of live entities whose hit box extents overlap the rectangle, in row order."""
+        n = self.size
+        x = self.x[:n]
+        y = self.y[:n]
+        hit = (self.alive[:n]
+               & (x + self.box_left[:n] < right) & (x + self.box_right[:n] > left)
+               & (y + self.box_bottom[:n] < top) & (y + self.box_top[:n] > bottom))
+        return np.flatnonzero(hit)
+
+    def set_alive(self, alive):
+        """Replace the alive flags (e.g. from a snapshot), showing or hiding the sprites that changed."""
+        n = self.size
+        for row in np.flatnonzero(alive != self.alive[:n]):
+            if row < len(self.sprites):
+                self.sprites[row].visible = bool(alive[row])
+        self.alive[:n] = alive
+        self.sync_rows = None
+
+    def kill(self, row):
+        self.alive[row] = False
+        if row < len(self.sprites):
+            self.sprites[row].visible = False
+        self.sync_rows = None
+
+    def sync(self, sprite_list):
+        """Write live entities' positions into sprite_list's position buffer (arcade 3.3 internals), else each sprite's."""
+        if self.sync_rows is None:
+            n = self.size
+            rows = np.flatnonzero(self.alive[:n] & (self.slot[:n] >= 0))
+            self.sync_rows = (rows, self.slot[rows])
+        rows, slots = self.sync_rows
+        if not (hasattr(sprite_list, "_sprite_pos_angle_data") and hasattr(sprite_list, "_sprite_pos_angle_changed")):
+            for row, x, y in zip(rows.tolist(), self.x[rows].tolist(), self.y[rows].tolist()):
+                self.sprites[row].position = (x, y)
+            return
+        # The view must be gone before the list next grows: array('f') can't resize while exported
+        data = np.frombuffer(sprite_list._sprite_pos_angle_data, dtype=np.float32).reshape(-1, 4)
+        data[slots, 0] = self.x[rows]
+        data[slots, 1] = self.y[rows]
+        del data
+        sprite_list._sprite_pos_angle_changed = True
+
+    def clear(self):
+        """Forget every entity; returns their sprites, which the caller takes out of their list."""
+        sprites = self.sprites
+        self.size = 0
+        self.time = 0.0
+        self.alive[:] = False
+        self.slot[:] = -1
+        self.sprites = []
+        self.motion_rows = None
+        self.sync_rows = None
+        return sprites
+
+
+class ChunkedScene:
+    """Scene layers split into x chunks, so only the chunks around the camera are drawn and collision-checked."""
+    def __init__(self, layers, chunk_width=CHUNK_WIDTH):
+        self.chunk_width = chunk_width
+        self.layers = []  # (sprite_list, {chunk index: SpriteList} or None)
+        for sprite_list, chunked in layers:
+            if not chunked:
+                self.layers.append((sprite_list, None))
+                continue
+            chunks = {}
+            for sprite in sprite_list:
+                index = int(sprite.center_x // chunk_width)
+                if index not in chunks:
+                    chunks[index] = arcade.SpriteList()
+                    chunks[index].visible = sprite_list.visible
+                chunks[index].append(sprite)
+            self.layers.append((sprite_list, chunks))
+
+        self.baked = set()  # ids of lists holding pre-rendered chunks
+        self.first = self.last = None
+        self.draw_lists = []
+        self.stats = {"active_chunks": 0, "draw_calls": 0, "sprites": 0}
+
+    def update_view(self, left, right):
+        """Activate the chunks overlapping left..right; True if the active range changed."""
+        first = int(left // self.chunk_width)
+        last = int(right // self.chunk_width)
+        if (first, last) == (self.first, self.last):
+            return False
+
+        self.first, self.last = first, last
+        self.draw_lists = []
+        for sprite_list, chunks in self.layers:
+            if chunks is None:
+                self.draw_lists.append(sprite_list)
+            else:
+                self.draw_lists.extend(self.active(sprite_list, chunks))
+        return True
+
+    def bake(self, static_lists, ctx):
+        """Pre-render each run of consecutive static layers into one texture per chunk. Needs a GL context."""
+        layers = []
+        run = []
+        for sprite_list, chunks in self.layers + [(None, None)]:
+            if chunks is not None and any(sprite_list is static for static in static_lists):
+                run.append((sprite_list, chunks))
+                continue
+            if run:
+                layers.append((self._bake_run(run, ctx), None))
+                run = []
+            if sprite_list is not None:
+                layers.append((sprite_list, chunks))
+        self.layers = layers
+        self.first = self.last = None
+
+    def _bake_run(self, run, ctx):
+        width = self.chunk_width
+        run = [(sprite_list, chunks) for sprite_list, chunks in run if sprite_list.visible]
+        baked = arcade.SpriteList(atlas=arcade.DefaultTextureAtlas((4096, 4096)))
+        self.baked.add(id(baked))
+        # Straight alpha in, premultiplied alpha out, so edges don't darken when drawn again
+        blend = (ctx.SRC_ALPHA, ctx.ONE_MINUS_SRC_ALPHA, ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA)
+
+        for index in sorted({index for _, chunks in run for index in chunks}):
+            # Sprites are binned by center, so neighbours can reach into this chunk
+            sources = [chunks[i] for _, chunks in run for i in (index - 1, index, index + 1) if i in chunks]
+            left = index * width
+            bottom = math.floor(min(sprite.bottom for sprites in sources for sprite in sprites))
+            top = math.ceil(max(sprite.top for sprites in sources for sprite in sprites))
+
+            texture = arcade.Texture.create_empty(f"baked-{id(baked)}-{index}", (width, top - bottom))
+            chunk_sprite = arcade.Sprite(texture)
+            chunk_sprite.left = left
+            chunk_sprite.bottom = bottom
+            baked.append(chunk_sprite)
+
+            with baked.atlas.render_into(texture, projection=(left, left + width, bottom, top)) as fbo:
+                fbo.clear()
+                for sprites in sources:
+                    sprites.draw(blend_function=blend)
+        return baked
+
+    def add_chunk(self, sprite_list, index, sprites):
+        """Add sprites to chunk index of a chunked layer (endless mode streams chunks in)."""
+        chunks = next(c for layer, c in self.layers if layer is sprite_list)
+        if index not in chunks:
+            chunks[index] = arcade.SpriteList()
+            chunks[index].visible = sprite_list.visible
+        chunks[index].extend(sprites)
+        self.first = self.last = None
+
+    def clear(self):
+        """Empty every chunk list, so their sprites can be reused and nothing links back to this scene."""
+        for _, chunks in self.layers:
+            if chunks is not None:
+                for sprite_list in chunks.values():
+                    sprite_list.clear()
+        self.draw_lists = []
+        self.first = self.last = None
+
+    def drop_chunk(self, index):
+        for _, chunks in self.layers:
+            if chunks is not None:
+                chunks.pop(index, None)
+        self.first = self.last = None
+
+    def active(self, sprite_list, chunks=None):
+        """The active chunk lists of one layer, left to right."""
+        if chunks is None:
+            chunks = next(c for layer, c in self.layers if layer is sprite_list)
+        return [chunks[i] for i in range(self.first, self.last + 1) if i in chunks]
+
+    def visible_lists(self):
+        return [sprite_list for sprite_list in self.draw_lists if sprite_list.visible and sprite_list]
+
+    def submitted(self):
+        """(draw calls, sprites) a draw() of the active chunks submits."""
+        lists = self.visible_lists()
+        return len(lists), sum(len(sprite_list) for sprite_list in lists)
+
+    def draw(self):
+        lists = self.visible_lists()
+        for sprite_list in lists:
+            if id(sprite_list) in self.baked:
+                ctx = sprite_list.ctx
+                sprite_list.draw(blend_function=(ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA))
+            else:
+                sprite_list.draw()
+        self.stats = {
+            "active_chunks": self.last - self.first + 1,
+            "draw_calls": len(lists),
+            "sprites": sum(len(sprite_list) for sprite_list in lists),
+        }
+
+
+class FrameProfiler:
+    """Timed spans for the phases of each step and frame, in a fixed-size ring buffer."""
+    def __init__(self, capacity=PROFILER_CAPACITY):
+        self.enabled = False
+        self.capacity = capacity
+        self.names = [None] * capacity
+        self.starts = [0.0] * capacity
+        self.durations = [0.0] * capacity
+        self.count = 0  # spans ever recorded; the buffer holds the last `capacity`
+        self.phases = {}  # phase name -> None, in the order first recorded
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def lap(self, name, start):
+        if start is None:
+            return None
+        now = time.perf_counter()
+        i = self.count % self.capacity
+        if name not in self.phases:
+            self.phases[name] = None
+        self.names[i] = name
+        self.starts[i] = start
+        self.durations[i] = now - start
+        self.count += 1
+        return now
+
+    def spans(self):
+        """(name, start, duration) of the buffered spans, oldest first."""
+        first = max(0, self.count - self.capacity)
+        return [
+            (self.names[i % self.capacity], self.starts[i % self.capacity], self.durations[i % self.capacity])
+            for i in range(first, self.count)
+        ]
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """{phase: [duration in ms at each quantile]}, phases in the order first recorded."""
+        by_phase = {name: [] for name in self.phases}
+        for name, _, duration in self.spans():
+            by_phase[name].append(duration)
+        result = {}
+        for name, durations in by_phase.items():
+            if not durations:
+                continue
+            durations.sort()
+            result[name] = [durations[min(len(durations) - 1, len(durations) * q // 100)] * 1000 for q in quantiles]
+        return result
+
+    def export_chrome_trace(self, path):
+        """Write the buffered spans as Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+        events = [
+            {"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": 1, "tid": 1}
+            for name, start, duration in self.spans()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+    def clear(self):
+        self.count = 0
+        self.phases = {}
+
+
+PROFILER = FrameProfiler()
+
+
+class RenderScaleController:
+    """Picks the render scale from recent frame times: down when over budget, back up after a run within it."""
+    def __init__(self, budget=RENDER_FRAME_BUDGET, min_scale=RENDER_SCALE_MIN, step=RENDER_SCALE_STEP,
+                 window=RENDER_SCALE_WINDOW, up_frames=4 * RENDER_SCALE_WINDOW):
+        self.budget = budget
+        self.min_scale = min_scale
+        self.step = step
+        self.scale = 1.0
+        self.frame_times = deque(maxlen=window)
+        self.base_up_frames = up_frames
+        self.up_frames = up_frames
+        self.good_frames = 0
+        self.frames_since_up = None
+        # 90th-percentile frame time just before the last down-step, until the next window is judged
+        self.slow_before_down = None
+        self.changes = 0
+
+    def update(self, frame_time):
+        """Record one frame's time; returns True when the scale changed."""
+        self.frame_times.append(frame_time)
+        if self.frames_since_up is not None:
+            self.frames_since_up += 1
+        self.good_frames = self.good_frames + 1 if frame_time <= self.budget * 1.15 else 0
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return False
+
+        slow = sorted(self.frame_times)[int(len(self.frame_times) * 0.9)]
+        slow_before_down = self.slow_before_down
+        self.slow_before_down = None
+        if slow_before_down is not None and slow >= slow_before_down * 0.95:
+            self.scale = self.min_scale = min(1.0, self.scale + self.step)
+            self.frames_since_up = None
+        elif slow > self.budget * 1.15 and self.scale > self.min_scale:
+            if self.frames_since_up is not None:
+                # Undoing an up-step: back off if it barely held, start over if it held a while
+                if self.frames_since_up < 2 * self.frame_times.maxlen:
+                    self.up_frames = min(self.up_frames * 2, 16 * self.base_up_frames)
+                else:
+                    self.up_frames = self.base_up_frames
+            self.scale = max(self.min_scale, self.scale - self.step)
+            self.frames_since_up = None
+            self.slow_before_down = slow
+        elif self.good_frames >= self.up_frames and self.scale < 1:
+            self.scale = min(1.0, self.scale + self.step)
+            self.frames_since_up = 0
+        else:
+            return False
+        # Judge the new scale on frames drawn at it
+        self.frame_times.clear()
+        self.good_frames = 0
+        self.changes += 1
+        return True
+
+
+class ScaledRenderer:
+    """Draws a camera into an off-screen framebuffer at `scale` times the window size and stretches it over the window."""
+    def __init__(self, window):
+        self.window = window
+        self.ctx = window.ctx
+        self.fbo = None
+        self.active = False
+        self.quad = arcade.gl.geometry.quad_2d_fs()
+
+    @property
+    def size(self):
+        return self.fbo.size if self.active else self.window.get_framebuffer_size()
+
+    def begin(self, camera, scale, color):
+        """Set camera's render target and viewport for this scale, clearing the buffer."""
+        if scale >= 1:
+            if self.active or camera.render_target is not None:
+                camera.render_target = None
+                camera.viewport = self.window.rect
+            self.active = False
+            return
+        width, height = self.window.get_framebuffer_size()
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if self.fbo is None or self.fbo.size != size:
+            texture = self.ctx.texture(size, filter=(self.ctx.NEAREST, self.ctx.NEAREST))
+            self.fbo = self.ctx.framebuffer(color_attachments=[texture])
+        camera.render_target = self.fbo
+        camera.viewport = arcade.LBWH(0, 0, *size)
+        self.fbo.clear(color=color)
+        self.active = True
+
+    def finish(self):
+        """Upscale the buffer over the whole window and make the window the render target again."""
+        screen = self.ctx.screen
+        screen.use()
+        if not self.active:
+            return
+        screen.viewport = (0, 0, self.window.width, self.window.height)
+        self.fbo.color_attachments[0].use(0)
+        with self.ctx.enabled_only():
+            self.quad.render(self.ctx.utility_textured_quad_program)
+
+
+# One GameView snapshot; which pickups (and movers) are still alive is kept beside it as a bitmask
+SNAPSHOT_DTYPE = np.dtype([
+    ("generation", "<i4"),
+    ("x", "<f8"), ("y", "<f8"), ("change_x", "<f8"), ("change_y", "<f8"),
+    ("camera_x", "<f8"), ("camera_y", "<f8"),
+    ("checkpoint_x", "<f8"), ("checkpoint_y", "<f8"),
+    ("walk_index", "<f8"), ("texture", "<i2"), ("facing_right", "?"),
+    ("score", "<i4"), ("lives", "<i4"), ("LEVEL", "<i4"),
+    ("entity_time", "<f8"),
+])
+
+
+class SnapshotRing:
+    """The last `capacity` snapshots in preallocated arrays; pushing overwrites the oldest once full."""
+    def __init__(self, capacity, item_count):
+        self.records = np.zeros(capacity, dtype=SNAPSHOT_DTYPE)
+        self.masks = np.zeros((capacity, (item_count + 7) // 8), dtype=np.uint8)
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes + self.masks.nbytes
+
+    def push(self, record, mask):
+        self.records[self.head] = record
+        self.masks[self.head] = mask
+        self.head = (self.head + 1) % len(self.records)
+        self.size = min(self.size + 1, len(self.records))
+
+    def pop(self):
+        """Newest (record, mask) and drop it, or None when empty."""
+        if not self.size:
+            return None
+        self.head = (self.head - 1) % len(self.records)
+        self.size -= 1
+        return self.records[self.head], self.masks[self.head]
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+
+def lerp_position(start, end, alpha):
+    return start[0] + (end[0] - start[0]) * alpha, start[1] + (end[1] - start[1]) * alpha
+
+
+def slice_y_range(points, left, right):
+    """Lowest and highest y of a convex polygon within the vertical strip left..right."""
+    ys = []
+    count = len(points)
+    for i in range(count):
+        x1, y1 = points[i]
+        x2, y2 = points[(i + 1) % count]
+        if left <= x1 <= right:
+            ys.append(y1)
+        for x in (left, right):
+            if (x1 - x) * (x2 - x) < 0:
+                ys.append(y1 + (y2 - y1) * (x - x1) / (x2 - x1))
+    return min(ys), max(ys)
+
+
+def polygons_overlap(a, b):
+    """Separating-axis test for convex polygons given as point sequences. Touching doesn't count."""
+    for polygon in (a, b):
+        count = len(polygon)
+        for i in range(count):
+            x1, y1 = polygon[i]
+            x2, y2 = polygon[(i + 1) % count]
+            axis_x, axis_y = y2 - y1, x1 - x2
+            if not axis_x and not axis_y:
+                continue
+            proj_a = [x * axis_x + y * axis_y for x, y in a]
+            proj_b = [x * axis_x + y * axis_y for x, y in b]
+            if max(proj_a) <= min(proj_b) or max(proj_b) <= min(proj_a):
+                return False
+    return True
+
+
+class TileGrid:
+    """Occupancy grid of static wall shapes (tiles, crates) for GridPhysicsEngine."""
+    def __init__(self, wall_lists, cell_size=64):
+        self.cell_size = cell_size
+        self.shapes = []  # (left, bottom, right, top, polygon or None for plain rectangles)
+        self.cells = {}  # (cx, cy) -> [shape index, ...]
+        self.indices = {}  # sprite -> shape index
+        self.free = []  # indices of removed shapes, reused by add()
+
+        for walls in wall_lists:
+            for sprite in walls:
+                self.add(sprite)
+
+    def _cells_for(self, shape):
+        size = self.cell_size
+        left, bottom, right, top, _ = shape
+        return [
+            (cx, cy)
+            for cx in range(int(left // size), int(right // size) + 1)
+            for cy in range(int(bottom // size), int(top // size) + 1)
+        ]
+
+    def add(self, sprite):
+        points = tuple(sprite.hit_box.get_adjusted_points())
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        is_rect = len(points) == 4 and len(set(xs)) == 2 and len(set(ys)) == 2
+        shape = (min(xs), min(ys), max(xs), max(ys), None if is_rect else points)
+        if self.free:
+            index = self.free.pop()
+            self.shapes[index] = shape
+        else:
+            index = len(self.shapes)
+            self.shapes.append(shape)
+        self.indices[sprite] = index
+        for cell in self._cells_for(shape):
+            self.cells.setdefault(cell, []).append(index)
+
+    def remove(self, sprite):
+        index = self.indices.pop(sprite, None)
+        if index is None:
+            return
+        for cell in self._cells_for(self.shapes[index]):
+            bucket = self.cells[cell]
+            bucket.remove(index)
+            if not bucket:
+                del self.cells[cell]
+        self.shapes[index] = None
+        self.free.append(index)
+
+    def hits(self, points, sweep_down=0, sweep_up=0):
+        """Contacts between the polygon points (optionally swept vertically) and the walls, as y extents."""
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        left, right = min(xs), max(xs)
+        bottom, top = min(ys) - sweep_down, max(ys) + sweep_up
+
+        size = self.cell_size
+        contacts = []
+        seen = set()
+        swept = None  # points plus their vertically swept copies, built on first use
+        for cx in range(int(left // size), int(right // size) + 1):
+            for cy in range(int(bottom // size), int(top // size) + 1):
+                for index in self.cells.get((cx, cy), ()):
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    s_left, s_bottom, s_right, s_top, s_points = self.shapes[index]
+                    if not (s_left < right and left < s_right and s_bottom < top and bottom < s_top):
+                        continue
+
+                    # Against rectangles, overlapping y extents inside the shared columns is
+                    # exact. Other shapes (slopes, bevelled crates) need a full polygon test.
+                    strip_left = max(left, s_left)
+                    strip_right = min(right, s_right)
+                    low, high = slice_y_range(points, strip_left, strip_right)
+                    if s_points is not None:
+                        if swept is None:
+                            swept = list(points)
+                            if sweep_down:
+                                swept += [(x, y - sweep_down) for x, y in points]
+                            if sweep_up:
+                                swept += [(x, y + sweep_up) for x, y in points]
+                        if not polygons_overlap(swept, s_points):
+                            continue
+                        s_bottom, s_top = slice_y_range(s_points, strip_left, strip_right)
+                    elif not (low - sweep_down < s_top and s_bottom < high + sweep_up):
+                        continue
+                    contacts.append((low, high, s_bottom, s_top, s_points is None))
+        return contacts
+
+
+class GridPhysicsEngine:
+    """arcade.PhysicsEnginePlatformer's movement rules, resolved only against the TileGrid cells around the player."""
+    def __init__(self, player_sprite, walls, gravity_constant=0.5, cell_size=64):
+        self.player_sprite = player_sprite
+        self.gravity_constant = gravity_constant
+        self.grid = TileGrid(walls, cell_size)
+
+    @staticmethod
+    def _moved(points, dx, dy):
+        return [(x + dx, y + dy) for x, y in points]
+
+    def can_jump(self, y_distance=5):
+        points = self.player_sprite.hit_box.get_adjusted_points()
+        return bool(self.grid.hits(self._moved(points, 0, -y_distance)))
+
+    def update(self):
+        player = self.player_sprite
+        grid = self.grid
+        player.change_y -= self.gravity_constant
+
+        x, y = player.position
+        points = player.hit_box.get_adjusted_points()
+
+        # Started inside something: probe outward like arcade does until a free spot turns up
+        if grid.hits(points):
+            distance = 1
+            while True:
+                offsets = [(0, distance), (0, -distance), (distance, 0), (-distance, 0),
+                           (distance, distance), (distance, -distance), (-distance, distance), (-distance, -distance)]
+                free = next((o for o in offsets if not grid.hits(self._moved(points, *o))), None)
+                if free:
+                    x += free[0]
+                    y += free[1]
+                    points = self._moved(points, *free)
+                    break
+                distance *= 2
+        start_y = y
+
+        # --- Move in the y direction, stopping flush against whatever is in the way.
+        # Sloped or bevelled walls are backed out of in arcade's steps (0.25 px up, 1 px down).
+        dy = player.change_y
+        if dy < 0:
+            contacts = grid.hits(points, sweep_down=-dy)
+            if contacts:
+                if all(contact[4] for contact in contacts):
+                    dy = max(s_top - low for low, _, _, s_top, _ in contacts)
+                else:
+                    while grid.hits(self._moved(points, 0, dy)):
+                        dy += 0.25
+                player.change_y = 0
+        elif dy > 0:
+            contacts = grid.hits(points, sweep_up=dy)
+            if contacts:
+                if all(contact[4] for contact in contacts):
+                    dy = min(s_bottom - high for _, high, s_bottom, _, _ in contacts)
+                else:
+                    while grid.hits(self._moved(points, 0, dy)):
+                        dy -= 1
+                player.change_y = 0
+        new_y = round(y + dy, 2)
+        points = self._moved(points, 0, new_y - y)
+        y = new_y
+
+        # --- Move in the x direction: the furthest whole step that fits, ramping up small steps.
+        # This mirrors arcade's search step for step, including its quirk of leaving the probe
+        # at the last height tried, so both engines settle on the same pixel.
+        if player.change_x:
+            direction = math.copysign(1, player.change_x)
+            cur_x_change = abs(player.change_x)
+            upper_bound = cur_x_change
+            lower_bound = 0
+            cur_y_change = 0
+            probe_y = 0  # probe height relative to y
+            while True:
+                shift = cur_x_change * direction
+                blocked = bool(grid.hits(self._moved(points, shift, probe_y)))
+                if blocked:
+                    # Try climbing by the step size (measured from before the y move, as arcade does)
+                    cur_y_change = cur_x_change
+                    probe_y = start_y - y + cur_y_change
+                    if grid.hits(self._moved(points, shift, probe_y)):
+                        cur_y_change = 0
+                    else:
+                        while cur_y_change > 0:
+                            cur_y_change -= 1
+                            probe_y = cur_y_change
+                            if grid.hits(self._moved(points, shift, probe_y)):
+                                break
+                        cur_y_change += 1
+                        blocked = False
+                    if blocked:
+                        upper_bound = cur_x_change - 1
+                        if upper_bound - lower_bound <= 0:
+                            cur_x_change = lower_bound
+                            break
+                        cur_x_change = (upper_bound + lower_bound) // 2
+                    else:
+                        break
+                else:
+                    lower_bound = cur_x_change
+                    if upper_bound - lower_bound <= 0:
+                        break
+                    cur_x_change = (upper_bound + lower_bound) // 2 + (upper_bound + lower_bound) % 2
+            x += cur_x_change * direction
+            y += cur_y_change
+
+        player.position = x, y
+
+
+class AssetCache:
+    """Process-wide LRU of decoded textures (characters, items) and sounds."""
+    def __init__(self, max_bytes=ASSET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (assets, size in bytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The level loader thread shares these caches with the main thread
+        self.lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+
+            self.misses += 1
+            assets, size = loader()
+            self.entries[key] = (assets, size)
+            self.total_bytes += size
+
+            # Keep at least the entry we just loaded, even if it alone is over the cap
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+            return assets
+
+    def character(self, character_data):
+        folder = character_data['path']
+        prefix = character_data['prefix']
+        return self.get(("character", folder, prefix), lambda: self._load_character(folder, prefix))
+
+    def sounds(self):
+        return self.get(("sounds",), self._load_sounds)
+
+    def items(self):
+        """kind -> (texture, scale, hit box bottom offset, hit box height) for every entry in ITEMS."""
+        return self.get(("items",), self._load_items)
+
+    def item_height(self, kind):
+        return self.items()[kind][3]
+
+    def terrain(self):
+        return self.get(("terrain",), self._load_terrain)
+
+    def entities(self):
+        """kind -> (texture, scale, hit box (left, bottom, right, top) offsets) for every entry in ENTITY_KINDS."""
+        return self.get(("entities",), self._load_entities)
+
+    def font(self):
+        """Register the retro font with pyglet on first use; returns its name."""
+        return self.get(("font",), self._load_font)
+
+    def button_style(self):
+        """UIFlatButton styles (normal, hover, press) in the retro font."""
+        self.font()
+        return self.get(("button_style",), self._load_button_style)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    @staticmethod
+    def _load_character(folder, prefix):
+        # Structure: :resources:/images/animated_characters/{path}/{prefix}_{action}.png
+        base_path = f":resources:/images/animated_characters/{folder}/{prefix}"
+
+        jump = arcade.load_texture(f"{base_path}_jump.png")
+        fall = arcade.load_texture(f"{base_path}_fall.png")
+        walk = [arcade.load_texture(f"{base_path}_walk{i}.png") for i in range(8)]
+
+        assets = {
+            "idle": arcade.load_texture(f"{base_path}_idle.png"),
+            "jump_right": jump,
+            "jump_left": jump.flip_left_right(),
+            "fall_right": fall,
+            "fall_left": fall.flip_left_right(),
+            "walk_right": walk,
+            "walk_left": [tex.flip_left_right() for tex in walk],
+        }
+
+        # Mirrored textures share their source image, so count each image once
+        images = {id(tex.image): tex.image for tex in [assets["idle"], jump, fall] + walk}
+        size = sum(image.width * image.height * 4 for image in images.values())
+        return assets, size
+
+    @staticmethod
+    def _load_items():
+        assets = {}
+        images = {}
+        for kind, (path, scale, _) in ITEMS.items():
+            texture = arcade.load_texture(path)
+            # Sprite.bottom/top follow the hit box, not the full image, so keep its extents
+            hit_ys = [point[1] * scale for point in texture.hit_box_points]
+            assets[kind] = (texture, scale, -min(hit_ys), max(hit_ys) - min(hit_ys))
+            images[id(texture.image)] = texture.image
+        size = sum(image.width * image.height * 4 for image in images.values())
+        return assets, size
+
+    @staticmethod
+    def _load_entities():
+        assets = {}
+        images = {}
+        for kind, (path, scale, *_) in ENTITY_KINDS.items():
+            texture = arcade.load_texture(path)
+            xs = [point[0] * scale for point in texture.hit_box_points]
+            ys = [point[1] * scale for point in texture.hit_box_points]
+            assets[kind] = (texture, scale, (min(xs), min(ys), max(xs), max(ys)))
+            images[id(texture.image)] = texture.image
+        size = sum(image.width * image.height * 4 for image in images.values())
+        return assets, size
+
+    @staticmethod
+    def _load_terrain():
+        assets = {name: arcade.load_texture(path) for name, path in TERRAIN.items()}
+        size = sum(texture.image.width * texture.image.height * 4 for texture in assets.values())
+        return assets, size
+
+    @staticmethod
+    def _load_font():
+        arcade.load_font(RETRO_FONT_PATH)
+        return RETRO_FONT, 0
+
+    @staticmethod
+    def _load_button_style():
+        style = {
+            "normal": arcade.gui.UIFlatButton.UIStyle(
+                font_size=24, font_name=RETRO_FONT, font_color=COLOR_BTN_TEXT,
+                bg=COLOR_BTN_NORMAL, border=COLOR_BTN_PRESS, border_width=2,
+            ),
+            "hover": arcade.gui.UIFlatButton.UIStyle(
+                font_size=24, font_name=RETRO_FONT, font_color=COLOR_BTN_TEXT,
+                bg=COLOR_BTN_HOVER, border=COLOR_BTN_TEXT, border_width=2,
+            ),
+            "press": arcade.gui.UIFlatButton.UIStyle(
+                font_size=24, font_name=RETRO_FONT, font_color=arcade.color.WHITE,
+                bg=COLOR_BTN_PRESS, border=COLOR_BTN_PRESS, border_width=2,
+            ),
+        }
+        return style, 0
+
+    @staticmethod
+    def _load_sounds():
+        assets = {
+            "coin": arcade.load_sound(":resources:sounds/coin1.wav"),
+            "gem": arcade.load_sound(":resources:sounds/coin2.wav"),
+            "key": arcade.load_sound(":resources:sounds/secret2.wav"),
+            "jump": arcade.load_sound(":resources:sounds/jump1.wav"),
+            "gameover": arcade.load_sound(":resources:sounds/gameover1.wav"),
+        }
+        size = sum(len(getattr(sound.source, "_data", b"")) for sound in assets.values())
+        return assets, size
+
+
+ASSETS = AssetCache()
+# Generated item placements, keyed by (map, LEVEL, seed, spawn percentages)
+LEVEL_CACHE = AssetCache(max_bytes=LEVEL_CACHE_MAX_BYTES)
+
+
+class PooledSprite(arcade.Sprite):
+    """A sprite that SPRITE_POOL hands out again once released; it keeps its texture and scale."""
+    def __init__(self, kind, texture, scale, center_x, center_y):
+        super().__init__(texture, scale, center_x, center_y)
+        self.pool_kind = kind
+        self.pooled = False
+
+
+class SpritePool:
+    """Spare item and terrain sprites by kind, reused by level changes, restarts and streamed chunks."""
+    def __init__(self, max_free=POOL_MAX_FREE):
+        self.max_free = max_free
+        self.free = {}  # kind -> [PooledSprite, ...]
+        self.created = 0
+        self.reused = 0
+        self.dropped = 0
+
+    def acquire(self, kind, texture, scale, center_x, center_y):
+        free = self.free.get(kind)
+        if free and POOL_SPRITES:
+            sprite = free.pop()
+            sprite.pooled = False
+            sprite.position = (center_x, center_y)
+            self.reused += 1
+            return sprite
+        self.created += 1
+        return PooledSprite(kind, texture, scale, center_x, center_y)
+
+    def release(self, sprites):
+        for sprite in sprites:
+            # Collected pickups are also kept for rewinds, so the same sprite can come back twice
+            if not isinstance(sprite, PooledSprite) or sprite.pooled:
+                continue
+            free = self.free.setdefault(sprite.pool_kind, [])
+            if len(free) < self.max_free and POOL_SPRITES:
+                sprite.pooled = True
+                free.append(sprite)
+            else:
+                self.dropped += 1
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "dropped": self.dropped,
+            "free": {kind: len(sprites) for kind, sprites in self.free.items()},
+        }
+
+    def clear(self):
+        self.free.clear()
+
+
+SPRITE_POOL = SpritePool()
+
+
+def level_spawn_rates(difficulty, base_rates=BASE_SPAWN_RATES):
+    """Item percentages (crate, coin, bomb, gem, check) for a difficulty LEVEL."""
+    base_crate, base_coin, base_bomb, base_gem, base_check = base_rates
+    lvl_mult = difficulty - 1
+    return (
+        min(35, base_crate + (3 * lvl_mult)),
+        min(20, base_coin + (1 * lvl_mult)),
+        min(40, base_bomb + (5 * lvl_mult)),
+        min(10, base_gem + (1 * lvl_mult)),
+        min(15, base_check + (1 * lvl_mult)),
+    )
+
+
+def level_seed(level, run_seed=None):
+    """Seed for one level's generation: stable across processes for the same run seed."""
+    return (run_seed or 0) * 1_000_003 + level
+
+
+class LevelData:
+    """A parsed map and its generated item placements, ready to be turned into a Scene."""
+    def __init__(self, level, map_name, tile_map, heightmap, placements):
+        self.level = level
+        self.map_name = map_name
+        self.tile_map = tile_map
+        self.heightmap = heightmap
+        self.placements = placements
+
+
+def load_level_map(level):
+    """Parse a level's map (level 1's if it has none) and index its terrain: (level, map name, tile map, heightmap, width)."""
+    layer_options = {"Platforms": {"use_spatial_hash": True}}
+    map_name = f":resources:tiled_maps/map2_level_{level}.json"
+
+    try:
+        tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options, lazy=True)
+    except FileNotFoundError:
+        print(f"Map {map_name} not found, resetting local map to level 1")
+        level = 1
+        map_name = f":resources:tiled_maps/level_{level}.json"
+        tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options, lazy=True)
+
+    # Index the terrain once so ground queries don't scan every tile
+    platforms = tile_map.sprite_lists.get("Platforms", [])
+    heightmap = Heightmap(platforms, tile_map.tile_width * tile_map.scaling)
+    map_width = (tile_map.width * tile_map.tile_width) * tile_map.scaling
+    return level, map_name, tile_map, heightmap, map_width
+
+
+def load_level_data(level, difficulty, spawn_rates, run_seed=None):
+    """Parse a map and roll its items. Safe to call off the main thread: no GL objects are created."""
+    level, map_name, tile_map, heightmap, map_width = load_level_map(level)
+
+    def generate():
+        placements = generate_placements(random.Random(seed), heightmap, map_width, spawn_rates)
+        if VALIDATE_LEVELS:
+            placements, _ = VALIDATOR.repair(heightmap, placements, map_width)
+        placements = tuple(placements)
+        size = sys.getsizeof(placements) + sum(sys.getsizeof(p) for p in placements)
+        return placements, size
+
+    seed = level_seed(difficulty, run_seed)
+    placements = LEVEL_CACHE.get((map_name, difficulty, seed, spawn_rates), generate)
+    return LevelData(level, map_name, tile_map, heightmap, placements)
+
+
+def generate_placements(rng, heightmap, map_width, spawn_rates, x_range=None):
+    """Roll a level's items as compact (kind, center_x, bottom) tuples, optionally only within x_range."""
+    scan_step = 300
+    placements = []
+
+    curr_crate, curr_coin, curr_bomb, curr_gem, curr_check = spawn_rates
+    limit_crate = curr_crate
+    limit_coin = limit_crate + curr_coin
+    limit_bomb = limit_coin + curr_bomb
+    limit_gem = limit_bomb + curr_gem
+    limit_check = limit_gem + curr_check
+
+    crate_height = ASSETS.item_height("crate")
+
+    start_x, end_x = x_range if x_range else (400, map_width - 200)
+    for x_coord in range(int(start_x), int(end_x), scan_step):
+        actual_x = x_coord + rng.randint(-50, 50)
+        ground_y = heightmap.ground_y(actual_x)
+
+        if ground_y < 0:
+            continue
+
+        roll = rng.randint(1, 100)
+
+        if roll <= limit_crate:
+            stack_height = rng.randint(1, 3)
+            for i in range(stack_height):
+                placements.append(("crate", actual_x, ground_y + i * crate_height))
+            placements.append(("coin_silver", actual_x, ground_y + stack_height * crate_height + 10))
+
+        elif roll <= limit_coin:
+            for i in range(3):
+                placements.append(("coin_bronze", actual_x + (i * 40), ground_y + 10))
+
+        elif roll <= limit_bomb:
+            placements.append(("bomb", actual_x, ground_y))
+
+        elif roll <= limit_gem:
+            placements.append(("gem", actual_x, ground_y + 250))
+
+        elif roll <= limit_check:
+            placements.append(("key", actual_x, ground_y + 10))
+
+    return placements
+
+
+def generate_movers(rng, heightmap, map_width, count):
+    """Roll count moving entities as (kind, origin_x, ground_y, phase), each staying on the map."""
+    kinds = list(ENTITY_KINDS)
+    movers = []
+    for _ in range(count * 4):
+        if len(movers) == count:
+            break
+        kind = rng.choice(kinds)
+        amplitude = ENTITY_KINDS[kind][4] if ENTITY_KINDS[kind][3] == MOTION_PATROL else 0
+        origin_x = rng.uniform(400, map_width - 200 - amplitude)
+        ground_y = heightmap.ground_y(origin_x)
+        if ground_y >= 0:
+            movers.append((kind, origin_x, ground_y, rng.random()))
+    return movers
+
+
+def generate_terrain(rng, index, start_rows, difficulty, tile_size):
+    """Roll one endless-mode chunk of ground as (kind, center_x, center_y) tiles, plus its last column's height."""
+    columns = int(CHUNK_WIDTH // tile_size)
+    left = index * CHUNK_WIDTH
+    pit_chance = min(0.04 + 0.01 * difficulty, 0.12)
+    tiles = []
+    rows = start_rows
+    pit = 0
+    solid_run = 0  # columns since the last pit: at least two between pits, so no gap is over two wide
+
+    for col in range(columns):
+        center_x = left + col * tile_size + tile_size / 2
+        solid_start = col < 2 or (index == 0 and col < columns // 2)
+        if pit:
+            pit -= 1
+            continue
+        if not solid_start and col < columns - 1 and solid_run >= 2 and rng.random() < pit_chance:
+            pit = rng.randint(0, 1)
+            solid_run = 0
+            continue
+        solid_run += 1
+
+        if not solid_start and rng.random() < 0.2:
+            rows = max(1, min(5, rows + rng.choice((-1, 1))))
+        for row in range(rows):
+            tiles.append(("top" if row == rows - 1 else "fill", center_x, row * tile_size + tile_size / 2))
+        if not solid_start and rng.random() < 0.06:
+            tiles.append(("top", center_x, (rows + 4) * tile_size + tile_size / 2))
+    return tiles, rows
+
+
+class ReachabilityValidator:
+    """Checks a generated layout: reachable surfaces, pickups out of reach and crate stacks walling off the exit."""
+    COLLECTIBLES = ("coin_bronze", "coin_silver", "gem", "key")
+
+    def __init__(self, jump_speed=PLAYER_JUMP_SPEED, gravity=GRAVITY, move_speed=PLAYER_MOVEMENT_SPEED,
+                 player_size=PLAYER_HITBOX_SIZE, max_drop=2048):
+        self.move_speed = move_speed
+        self.player_width, self.player_height = player_size
+
+        heights = []
+        y = 0
+        change_y = jump_speed
+        while y > -max_drop:
+            change_y -= gravity
+            y += change_y
+            heights.append(y)
+        # envelope[d]: highest point of a jump whose (full speed) travel is at least d px
+        latest = np.maximum.accumulate(np.array(heights[::-1]))[::-1]
+        distances = np.arange(len(heights) * move_speed + 1)
+        ticks = np.maximum(np.ceil(distances / move_speed).astype(int), 1)
+        self.envelope = np.append(latest[ticks - 1], -np.inf)  # past the last entry: out of reach
+
+    def reach(self, distances):
+        """Envelope heights for an array of horizontal distances (px)."""
+        index = np.clip(distances, 0, len(self.envelope) - 1).astype(int)
+        return self.envelope[index]
+
+    def geometry(self, heightmap, placements):
+        """Per column solids (bottoms, tops padded to one width) and the standable surfaces among them."""
+        width = heightmap.column_width
+        crate_height = ASSETS.item_height("crate")
+        solids = {col: [(top - width, top) for top, _, _ in entries] for col, entries in heightmap.columns.items()}
+        for kind, center_x, bottom in placements:
+            if kind == "crate":
+                for col in range(int((center_x - width / 2) // width), int(math.ceil((center_x + width / 2) / width))):
+                    solids.setdefault(col, []).append((bottom, bottom + crate_height))
+
+        first, last = min(solids), max(solids)
+        depth = max(len(column) for column in solids.values())
+        bottoms = np.full((last - first + 3, depth), np.inf)  # a column of padding either side
+        tops = np.full_like(bottoms, -np.inf)
+        surfaces = []
+        for col, column in solids.items():
+            for i, (bottom, top) in enumerate(column):
+                bottoms[col - first + 1, i] = bottom
+                tops[col - first + 1, i] = top
+                # A top is standable unless another solid in the column covers it
+                if not any(b <= top < t for b, t in column):
+                    surfaces.append((col, top))
+        surfaces = np.array(sorted(set(surfaces)), dtype=float).reshape(-1, 2)
+        # Lowest solid first in every column, so stacks can be followed up in one pass
+        order = np.argsort(bottoms, axis=1)
+        return first - 1, np.take_along_axis(bottoms, order, axis=1), np.take_along_axis(tops, order, axis=1), surfaces
+
+    def validate(self, heightmap, placements, map_width, spawn=(128, 128)):
+        """Report on a layout: reachable surfaces, unreachable pickups and whether the exit can be reached."""
+        width = heightmap.column_width
+        offset, bottoms, tops, surfaces = self.geometry(heightmap, placements)
+        cols = surfaces[:, 0].astype(int)
+        heights = surfaces[:, 1]
+        lefts = cols * width
+        rights = lefts + width
+        step = self.move_speed  # the engines climb steps up to one move's worth
+
+        # Walls between two surfaces: for every surface, direction and column offset j, the top
+        # of the solids in that column the player would run into, followed up through every
+        # solid stacked on them with less than the hit box's height between, against the arc
+        max_offset = int(math.ceil(len(self.envelope) / width)) + 1
+        clear = np.ones((2, len(surfaces), max_offset + 1), dtype=bool)
+        for side, direction in enumerate((1, -1)):
+            for j in range(1, max_offset):
+                column = np.clip(cols + direction * j - offset, 0, len(tops) - 1)
+                in_the_way = np.full(len(surfaces), -np.inf)
+                for k in range(bottoms.shape[1]):
+                    stacked = bottoms[column, k] < np.maximum(in_the_way, heights) + self.player_height
+                    in_the_way = np.where(stacked, np.maximum(in_the_way, tops[column, k]), in_the_way)
+                travel = max((j - 1) * width - self.player_width, 0)
+                ok = in_the_way - heights <= self.reach(np.array([travel]))[0] + step
+                clear[side, :, j + 1] = clear[side, :, j] & ok
+
+        # Every pair of surfaces at once: a jump from a to b needs the height difference under
+        # the envelope at the gap (less the hit box, which can hang over both edges)
+        gap = np.maximum(np.maximum(lefts[None, :] - rights[:, None], lefts[:, None] - rights[None, :]), 0)
+        travel = np.maximum(gap - self.player_width, 0)
+        col_offset = cols[None, :] - cols[:, None]
+        side = (col_offset < 0).astype(int)
+        distance = np.minimum(np.abs(col_offset), max_offset)
+        edges = (heights[None, :] - heights[:, None] <= self.reach(travel) + step)
+        edges &= clear[side, np.arange(len(surfaces))[:, None], distance]
+        np.fill_diagonal(edges, False)
+
+        # Breadth-first from the surface the player ends up on after spawning (the spawn point
+        # can be inside the ground, which pushes the player up out of it)
+        reached = np.zeros(len(surfaces), dtype=bool)
+        below = np.flatnonzero((cols == int(spawn[0] // width)) & (heights <= spawn[1] + self.player_height))
+        if len(below):
+            frontier = np.zeros_like(reached)
+            frontier[below[np.argmax(heights[below])]] = True
+            reached |= frontier
+            while frontier.any():
+                frontier = edges[frontier].any(axis=0) & ~reached
+                reached |= frontier
+
+        # Pickups: touched if the player's top gets past their bottom within the gap
+        items = ASSETS.items()
+        pickups = [p for p in placements if p[0] in self.COLLECTIBLES]
+        unreachable = []
+        if pickups:
+            size = np.array([items[kind][3] for kind, _, _ in pickups])
+            centers = np.array([center_x for _, center_x, _ in pickups])
+            item_bottoms = np.array([bottom for _, _, bottom in pickups])
+            gap = np.maximum(np.maximum((centers - size / 2)[:, None] - rights[reached][None, :],
+                                        lefts[reached][None, :] - (centers + size / 2)[:, None]), 0)
+            rise = item_bottoms[:, None] - heights[reached][None, :]
+            touched = rise <= self.reach(np.maximum(gap - self.player_width, 0)) + self.player_height
+            unreachable = [p for p, ok in zip(pickups, touched.any(axis=1)) if not ok]
+
+        # The level ends once the player's center passes map_width
+        exit_reachable = bool((rights[reached] + self.player_width / 2 > map_width).any())
+        blocking = []
+        if not exit_reachable and reached.any():
+            frontier_x = rights[reached].max()
+            blocking = [p for p in placements if p[0] == "crate"
+                        and frontier_x <= p[1] <= frontier_x + max_offset * width]
+        return {
+            "surfaces": len(surfaces),
+            "reachable_surfaces": int(reached.sum()),
+            "unreachable": unreachable,
+            "exit_reachable": exit_reachable,
+            "blocking_crates": blocking,
+        }
+
+    def repair(self, heightmap, placements, map_width, spawn=(128, 128), max_rounds=10):
+        """Remove blocking crates and unreachable pickups until the layout validates; returns (placements, report)."""
+        crate_height = ASSETS.item_height("crate")
+        placements = list(placements)
+        repairs = {}
+        for _ in range(max_rounds):
+            report = self.validate(heightmap, placements, map_width, spawn)
+            if report["blocking_crates"]:
+                stack_x = min(x for _, x, _ in report["blocking_crates"])
+                stack = [p for p in placements if p[0] == "crate" and p[1] == stack_x]
+                placements.remove(max(stack, key=lambda p: p[2]))
+                placements = [(kind, x, bottom - crate_height) if kind == "coin_silver" and x == stack_x else (kind, x, bottom)
+                              for kind, x, bottom in placements]
+                repairs["crates_removed"] = repairs.get("crates_removed", 0) + 1
+                continue
+            if report["unreachable"]:
+                dropped = set(report["unreachable"])
+                placements = [p for p in placements if p not in dropped]
+                repairs["pickups_dropped"] = repairs.get("pickups_dropped", 0) + len(dropped)
+                continue
+            break
+        else:
+            report = self.validate(heightmap, placements, map_width, spawn)
+        report["repairs"] = repairs
+        return placements, report
+
+
+VALIDATOR = ReachabilityValidator()
+
+
+class LevelLoader:
+    """Prepares the next level's LevelData on a worker thread while the current level is played."""
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-loader")
+        self.pending = {}  # load_level_data arguments -> Future
+        self.swap_times = deque(maxlen=32)  # ms spent in setup() per level change
+        self.sources = Counter()  # setups by where the level came from: prefetched, loaded inline or streamed
+
+    def prefetch(self, level, difficulty, spawn_rates, run_seed=None):
+        request = (level, difficulty, spawn_rates, run_seed)
+        # Only one view plays at a time, so anything else queued is stale
+        for other in list(self.pending):
+            if other != request:
+                self.pending.pop(other).cancel()
+        if request not in self.pending:
+            self.pending[request] = self.executor.submit(load_level_data, *request)
+
+    def take(self, level, difficulty, spawn_rates, run_seed=None):
+        """The prefetched LevelData for this request (waiting if it is still loading), or None."""
+        future = self.pending.pop((level, difficulty, spawn_rates, run_seed), None)
+        if future is None or future.cancelled():
+            return None
+        return future.result()
+
+    def stats(self):
+        """{"count", "median_ms", "max_ms"} of the last level setups, and "sources": setups by where the level came from."""
+        times = sorted(self.swap_times)
+        return {
+            "count": len(times),
+            "median_ms": times[len(times) // 2] if times else 0.0,
+            "max_ms": times[-1] if times else 0.0,
+            "sources": dict(self.sources),
+        }
+
+
+LEVEL_LOADER = LevelLoader()
+
+
+class EndlessWorld:
+    """Endless-mode terrain, generated in chunks ahead of the camera and evicted behind it."""
+    def __init__(self, view, start_difficulty=1):
+        self.view = view
+        self.start_difficulty = start_difficulty
+        self.tile_size = ASSETS.terrain()["top"].width * TILE_SCALING
+        self.chunks = OrderedDict()  # index -> (start height in tiles, [sprite, ...])
+        self.next_index = 0
+        self.next_rows = 2
+        self.generated = 0
+        self.evicted = 0
+
+    @property
+    def left(self):
+        """Left edge of the oldest live chunk: nothing exists before it."""
+        return next(iter(self.chunks)) * CHUNK_WIDTH if self.chunks else 0
+
+    def difficulty(self, index):
+        return self.start_difficulty + max(index, 0) // ENDLESS_CHUNKS_PER_LEVEL
+
+    def difficulty_at(self, x_pos):
+        return self.difficulty(int(x_pos // CHUNK_WIDTH))
+
+    def spawn_point(self):
+        """Just above the solid first columns of the oldest live chunk."""
+        index, (rows, _) = next(iter(self.chunks.items()))
+        return index * CHUNK_WIDTH + self.tile_size, (rows + 2) * self.tile_size
+
+    def sprite_count(self):
+        return sum(len(sprites) for _, sprites in self.chunks.values())
+
+    def update(self, left, right, budget=1):
+        """Generate chunks out to ENDLESS_LOOKAHEAD past right and evict those left of left, at most budget per call."""
+        while budget > 0 and self.next_index * CHUNK_WIDTH < right + ENDLESS_LOOKAHEAD:
+            self._generate(self.next_index)
+            budget -= 1
+        while budget > 0 and len(self.chunks) > 1:
+            index = next(iter(self.chunks))
+            if (index + 1) * CHUNK_WIDTH >= left:
+                break
+            self._evict(index)
+            budget -= 1
+
+    def _generate(self, index):
+        view = self.view
+        difficulty = self.difficulty(index)
+        rng = random.Random(f"endless:{view.run_seed or 0}:{index}")
+        start_rows = self.next_rows
+        tiles, self.next_rows = generate_terrain(rng, index, start_rows, difficulty, self.tile_size)
+
+        textures = ASSETS.terrain()
+        ground = [SPRITE_POOL.acquire(kind, textures[kind], TILE_SCALING, x, y) for kind, x, y in tiles]
+        view.scene["Platforms"].extend(ground)
+        view.chunks.add_chunk(view.scene["Platforms"], index, ground)
+
+        # Same density rules as a map level, at this chunk's difficulty, clear of its spawn columns
+        left = index * CHUNK_WIDTH
+        x_range = (400 if index == 0 else left + 256, left + CHUNK_WIDTH - 100)
+        heightmap = Heightmap(ground, self.tile_size)
+        placements = generate_placements(rng, heightmap, math.inf, view.spawn_rates(difficulty), x_range)
+        # A crate stack within three columns of a step, pit or ledge (a bomb within two) leaves no run-up to
+        # jump it from the low side, and unlike a map there is no other way round, so those stacks (and
+        # their coin) and bombs are dropped
+        run_up = {"crate": 3, "bomb": 2}
+        blocked = {x for kind, x, _ in placements if kind in run_up and not self._flat(heightmap, x, run_up[kind])}
+        placements = [placement for placement in placements if placement[1] not in blocked]
+        if VALIDATE_LEVELS:
+            # Checked up to two columns short of the chunk's end, which may be a pit jumped to the next chunk
+            spawn = (left + self.tile_size, (start_rows + 1) * self.tile_size)
+            placements, _ = VALIDATOR.repair(heightmap, placements, left + CHUNK_WIDTH - 2 * self.tile_size, spawn)
+        layers = view.place_dynamic_objects(placements)
+        for layer, sprites in layers.items():
+            view.chunks.add_chunk(view.scene[layer], index, sprites)
+        for layer, tag in PICKUP_LAYERS.items():
+            for sprite in layers.get(layer, ()):
+                view.entity_index.add(sprite, tag)
+
+        # The grid engine indexes walls once, so later chunks are added to it as they arrive
+        if view.physics == "grid" and view.physics_engine:
+            for sprite in ground + layers.get("Obstacles", []):
+                view.physics_engine.grid.add(sprite)
+
+        self.chunks[index] = (start_rows, ground + [sprite for sprites in layers.values() for sprite in sprites])
+        self.next_index = index + 1
+        self.generated += 1
+
+    def _flat(self, heightmap, x_pos, columns):
+        ground = heightmap.ground_y(x_pos)
+        return all(heightmap.ground_y(x_pos + side * col * self.tile_size) == ground
+                   for side in (-1, 1) for col in range(1, columns + 1))
+
+    def _evict(self, index):
+        view = self.view
+        _, sprites = self.chunks.pop(index)
+        grid = view.physics_engine.grid if view.physics == "grid" else None
+        for sprite in sprites:
+            view.entity_index.remove(sprite)
+            if grid:
+                grid.remove(sprite)
+            sprite.remove_from_sprite_lists()
+        SPRITE_POOL.release(sprites)
+        view.chunks.drop_chunk(index)
+        self.evicted += 1
+
+        # arcade's SpatialHash keeps a bucket for every cell ever touched, even once empty
+        spatial_hash = view.scene["Platforms"].spatial_hash
+        if spatial_hash:
+            for cell in [cell for cell, bucket in spatial_hash.contents.items() if not bucket]:
+                del spatial_hash.contents[cell]
+
+
+# --- Audio ---
+class PygletAudioBackend:
+    """Voices are pyglet players, each kept loaded with its effect and rewound to replay it."""
+    def create_voice(self, sound):
+        return pyglet.media.Player()
+
+    def is_playing(self, voice):
+        return voice.playing
+
+    def start(self, voice, sound):
+        if voice.source is None:
+            voice.queue(sound.source)
+        else:
+            voice.seek(0)
+        voice.play()
+
+
+class NullVoice:
+    def __init__(self):
+        self.ends_at = 0
+        self.plays = 0
+
+
+class NullAudioBackend:
+    """Plays nothing, but keeps each voice busy for its sound's length on the given clock."""
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+
+    def create_voice(self, sound):
+        return NullVoice()
+
+    def is_playing(self, voice):
+        return self.clock() < voice.ends_at
+
+    def start(self, voice, sound):
+        voice.ends_at = self.clock() + sound.get_length()
+        voice.plays += 1
+
+
+class SoundManager:
+    """A fixed pool of voices per sound effect, merging triggers within a frame and stealing the oldest voice."""
+    def __init__(self, backend, voices_per_effect=VOICES_PER_EFFECT):
+        self.backend = backend
+        self.voices_per_effect = voices_per_effect
+        self.pools = {}  # sound -> voices, least recently started first
+        self.frame_triggers = set()
+        self.stats = {"played": 0, "merged": 0, "stolen": 0}
+
+    def register(self, *sounds):
+        """Allocate the voices for sounds up front, so the first play doesn't."""
+        for sound in sounds:
+            if sound not in self.pools:
+                self.pools[sound] = deque(self.backend.create_voice(sound) for _ in range(self.voices_per_effect))
+
+    def play(self, sound):
+        if sound in self.frame_triggers:
+            self.stats["merged"] += 1
+            return
+        self.frame_triggers.add(sound)
+        self.register(sound)
+
+        pool = self.pools[sound]
+        voice = next((voice for voice in pool if not self.backend.is_playing(voice)), None)
+        if voice is None:
+            voice = pool[0]
+            self.stats["stolen"] += 1
+        pool.remove(voice)
+        pool.append(voice)
+        self.backend.start(voice, sound)
+        self.stats["played"] += 1
+
+    def end_frame(self):
+        self.frame_triggers.clear()
+
+
+SOUNDS = SoundManager(PygletAudioBackend())
+
+
+# --- Headless Stand-ins ---
+# Used by GameView(headless=True) in place of the window, cameras and text objects,
+# so the simulation can run without a display, GL context or audio device.
+class HeadlessWindow:
+    def __init__(self, width=WINDOW_WIDTH, height=WINDOW_HEIGHT):
+        self.width = width
+        self.height = height
+        self.current_view = None
+
+    def show_view(self, view):
+        self.current_view = view
+
+
+class HeadlessCamera:
+    def __init__(self):
+        self.position = (0, 0)
+
+    def use(self):
+        pass
+
+
+class HeadlessText:
+    def __init__(self, text, *args, **kwargs):
+        self.text = text
+
+    def draw(self):
+        pass
+
+
+class ViewRegistry:
+    """The windowed views, each built once and shown again, with every switch timed to the next view's first frame."""
+    def __init__(self):
+        self.views = {}
+        # Every new game gets a random run seed (kept for "Try Again"); the next one is rolled
+        # ahead so LoadingView can prefetch its first level
+        self.next_run_seed = random.randrange(2 ** 32)
+        self.pending = None  # (transition, start) until the shown view has drawn a frame
+        self.latencies = {}  # transition -> deque of ms
+
+    def get(self, name, factory):
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = factory()
+        return view
+
+    def menu(self):
+        return self.get("menu", MenuView)
+
+    def show(self, view, transition, start):
+        self.pending = (transition, start)
+        view.window.show_view(view)
+
+    def pause(self, game_view):
+        start = time.perf_counter()
+        menu = self.menu()
+        menu.main_view = game_view
+        self.show(menu, "pause", start)
+
+    def resume(self, game_view):
+        self.show(game_view, "resume", time.perf_counter())
+
+    def play(self, character_data, run_seed=None, endless=False, transition="new game"):
+        """Start a run in the GameView, building it the first time. No run_seed means a new random one."""
+        start = time.perf_counter()
+        if run_seed is None:
+            run_seed = self.next_run_seed
+            self.next_run_seed = random.randrange(2 ** 32)
+        game_view = self.views.get("game")
+        if game_view is None:
+            game_view = self.views["game"] = GameView(character_data=character_data, run_seed=run_seed, endless=endless)
+            game_view.setup()
+        else:
+            game_view.reset(character_data, run_seed, endless)
+        self.show(game_view, transition, start)
+
+    def game_over(self, game_view):
+        start = time.perf_counter()
+        view = self.get("game_over", GameOverView)
+        view.character_data = game_view.character_data
+        view.run_seed = game_view.run_seed
+        view.endless = game_view.endless
+        self.show(view, "game over", start)
+
+    def frame_drawn(self):
+        """Called at the end of each view's on_draw: completes the pending transition's timing."""
+        if self.pending is None:
+            return
+        transition, start = self.pending
+        self.pending = None
+        ms = (time.perf_counter() - start) * 1000
+        self.latencies.setdefault(transition, deque(maxlen=100)).append(ms)
+
+    def stats(self):
+        """{transition: (count, median ms, max ms)} over the last 100 of each."""
+        return {
+            transition: (len(times), sorted(times)[len(times) // 2], max(times))
+            for transition, times in self.latencies.items()
+        }
+
+
+VIEWS = ViewRegistry()
+
+
 class SubMenu(arcade.gui.UIMouseFilterMixin, arcade.gui.UIAnchorLayout):
     def __init__(self, title):
         super().__init__(size_hint=(1, 1))
@@ -73,7 +1869,8 @@ class SubMenu(arcade.gui.UIMouseFilterMixin, arcade.gui.UIAnchorLayout):
                 texture=arcade.load_texture(":resources:gui_basic_assets/window/grey_panel.png"),
             )
         )
-        back_button = arcade.gui.UIFlatButton(text="Back", width=250, style=RETRO_BUTTON_STYLE)
+        style = ASSETS.button_style()
+        back_button = arcade.gui.UIFlatButton(text="Back", width=250, style=style)
         back_button.on_click = self.on_click_back_button
         title_label = arcade.gui.UILabel(text=title, align="center", font_size=30, font_name=RETRO_FONT, text_color=COLOR_TEXT_MAIN)
         widget_layout = arcade.gui.UIBoxLayout(align="left", space_between=10)
@@ -85,6 +1882,61 @@ class SubMenu(arcade.gui.UIMouseFilterMixin, arcade.gui.UIAnchorLayout):
         self.parent.remove(self)
 
 
+class LoadingView(arcade.View):
+    """First view on launch: a progress bar while the startup assets load a frame's budget at a time."""
+    def __init__(self):
+        super().__init__()
+        self.tasks = [
+            ("level 1", lambda: LEVEL_LOADER.prefetch(1, 1, level_spawn_rates(1), VIEWS.next_run_seed)),
+            ("font", ASSETS.font),
+            ("button styles", ASSETS.button_style),
+            ("character", lambda: ASSETS.character(CHARACTERS[0])),
+            ("items", ASSETS.items),
+            ("sounds", ASSETS.sounds),
+            ("menu", self.build_menu),
+        ]
+        self.done = 0
+        self.drawn = False
+        self.menu = None
+        self.step_times = {}  # task name -> ms
+        self.label = arcade.Text("Loading", 0, 0, COLOR_TEXT_MAIN, 20, anchor_x="center")
+
+    def build_menu(self):
+        self.menu = VIEWS.menu()
+
+    def on_show_view(self):
+        arcade.set_background_color(COLOR_BG_MENU)
+
+    def on_update(self, delta_time):
+        # Let the first frame (just the bar) reach the screen before loading anything
+        if not self.drawn:
+            return
+        # As many steps as fit in LOADING_FRAME_BUDGET, so the bar keeps moving
+        frame_start = time.perf_counter()
+        while self.done < len(self.tasks) and time.perf_counter() - frame_start < LOADING_FRAME_BUDGET:
+            name, task = self.tasks[self.done]
+            start = time.perf_counter()
+            task()
+            self.step_times[name] = (time.perf_counter() - start) * 1000
+            self.done += 1
+        if self.done == len(self.tasks):
+            self.window.show_view(self.menu)
+
+    def on_draw(self):
+        self.clear()
+        center_x = self.window.width / 2
+        center_y = self.window.height / 2
+        progress = self.done / len(self.tasks)
+        arcade.draw_lrbt_rectangle_filled(center_x - 200, center_x - 200 + 400 * progress, center_y - 10, center_y + 10,
+                                          COLOR_BTN_PRESS)
+        arcade.draw_lrbt_rectangle_outline(center_x - 200, center_x + 200, center_y - 10, center_y + 10, COLOR_BTN_TEXT, 2)
+        if self.done < len(self.tasks):
+            self.label.text = f"Loading {self.tasks[self.done][0]}..."
+        self.label.position = (center_x, center_y + 30)
+        self.label.draw()
+        self.drawn = True
+
+
 class MenuView(arcade.View):
     def __init__(self, main_view=None):
         super().__init__()
@@ -97,23 +1949,26 @@ class MenuView(arcade.View):
         self.grid = arcade.gui.UIGridLayout(column_count=2, row_count=4, horizontal_spacing=20, vertical_spacing=20)
 
         # Buttons
-        resume_btn = arcade.gui.UIFlatButton(text="Resume", width=200, style=RETRO_BUTTON_STYLE)
-        start_new_btn = arcade.gui.UIFlatButton(text="New Game", width=200, style=RETRO_BUTTON_STYLE)
+        style = ASSETS.button_style()
+        resume_btn = arcade.gui.UIFlatButton(text="Resume", width=200, style=style)
+        start_new_btn = arcade.gui.UIFlatButton(text="New Game", width=200, style=style)
 
         # Character Toggle Button
         self.char_btn = arcade.gui.UIFlatButton(
             text=f"Char: {CHARACTERS[self.char_index]['name']}",
             width=420,
-            style=RETRO_BUTTON_STYLE
+            style=style
         )
 
-        exit_btn = arcade.gui.UIFlatButton(text="Exit", width=420, style=RETRO_BUTTON_STYLE)
+        endless_btn = arcade.gui.UIFlatButton(text="Endless", width=420, style=style)
+        exit_btn = arcade.gui.UIFlatButton(text="Exit", width=420, style=style)
 
         # Add to Grid
         self.grid.add(resume_btn, column=0, row=0)
         self.grid.add(start_new_btn, column=1, row=0)
         self.grid.add(self.char_btn, column=0, row=1, column_span=2)
-        self.grid.add(exit_btn, column=0, row=2, column_span=2)
+        self.grid.add(endless_btn, column=0, row=2, column_span=2)
+        self.grid.add(exit_btn, column=0, row=3, column_span=2)
 
         self.anchor = self.manager.add(arcade.gui.UIAnchorLayout())
         self.anchor.add(anchor_x="center_x", anchor_y="center_y", child=self.grid)
@@ -123,15 +1978,16 @@ class MenuView(arcade.View):
         @resume_btn.event("on_click")
         def on_click_resume_button(event):
             if self.main_view:
-                self.window.show_view(self.main_view)
+                VIEWS.resume(self.main_view)
 
         @start_new_btn.event("on_click")
         def on_click_start_new_game_button(event):
             # Pass the currently selected character data to the GameView
-            selected_char = CHARACTERS[self.char_index]
-            game_view = GameView(character_data=selected_char)
-            game_view.setup()
-            self.window.show_view(game_view)
+            VIEWS.play(CHARACTERS[self.char_index])
+
+        @endless_btn.event("on_click")
+        def on_click_endless_button(event):
+            VIEWS.play(CHARACTERS[self.char_index], endless=True, transition="endless")
 
         @self.char_btn.event("on_click")
         def on_click_char_button(event):
@@ -155,17 +2011,21 @@ class MenuView(arcade.View):
     def on_draw(self):
         self.clear()
         self.manager.draw()
+        VIEWS.frame_drawn()
 
 
 class GameOverView(arcade.View):
     """View to show when the player loses all lives."""
-    def __init__(self, character_data=None):
+    def __init__(self, character_data=None, run_seed=None, endless=False):
         super().__init__()
         self.manager = arcade.gui.UIManager()
-        # Remember the character used so we can restart with them
+        # Remember the character, run seed and mode used so we can restart with the same levels
         self.character_data = character_data if character_data else CHARACTERS[0]
+        self.run_seed = run_seed
+        self.endless = endless
 
         # Create layout
+        style = ASSETS.button_style()
         self.grid = arcade.gui.UIGridLayout(column_count=1, row_count=3, vertical_spacing=20)
 
         title_label = arcade.gui.UILabel(
@@ -176,8 +2036,8 @@ class GameOverView(arcade.View):
             align="center"
         )
 
-        restart_btn = arcade.gui.UIFlatButton(text="Try Again", width=250, style=RETRO_BUTTON_STYLE)
-        exit_btn = arcade.gui.UIFlatButton(text="Exit", width=250, style=RETRO_BUTTON_STYLE)
+        restart_btn = arcade.gui.UIFlatButton(text="Try Again", width=250, style=style)
+        exit_btn = arcade.gui.UIFlatButton(text="Exit", width=250, style=style)
 
         self.grid.add(title_label, column=0, row=0)
         self.grid.add(restart_btn, column=0, row=1)
@@ -188,9 +2048,7 @@ class GameOverView(arcade.View):
 
         @restart_btn.event("on_click")
         def on_restart(event):
-            game_view = GameView(character_data=self.character_data)
-            game_view.setup()
-            self.window.show_view(game_view)
+            VIEWS.play(self.character_data, self.run_seed, self.endless, transition="restart")
 
         @exit_btn.event("on_click")
         def on_exit(event):
@@ -206,36 +2064,107 @@ class GameOverView(arcade.View):
     def on_draw(self):
         self.clear()
         self.manager.draw()
+        VIEWS.frame_drawn()
 
 
 class GameView(arcade.View):
-    def __init__(self, character_data=None):
-        super().__init__()
-        self.manager = arcade.gui.UIManager()
+    def __init__(self, character_data=None, headless=False, run_seed=None, physics="arcade", bake_static=BAKE_STATIC_LAYERS,
+                 simulation_rate=SIMULATION_RATE, endless=False, prefetch=None, movers_per_level=MOVERS_PER_LEVEL):
+        # Headless views simulate only: no window, GUI, drawing or audio
+        self.headless = headless
+        # Parse the next level on the loader thread during play; by default only for windowed views,
+        # as headless runs (envs, replays, benchmarks) would just share their CPU with the thread
+        self.prefetch = not headless if prefetch is None else prefetch
+        super().__init__(window=HeadlessWindow() if headless else None)
 
         # Default to first character if none provided
         self.character_data = character_data if character_data else CHARACTERS[0]
-
-        pause_btn = arcade.gui.UIFlatButton(text="Pause", width=120, style=RETRO_BUTTON_STYLE)
-        @pause_btn.event("on_click")
-        def on_click_pause(event):
-            menu_view = MenuView(self)
-            self.window.show_view(menu_view)
-
-        self.anchor = self.manager.add(arcade.gui.UIAnchorLayout())
-        self.anchor.add(anchor_x="right", anchor_y="top", align_x=-20, align_y=-20, child=pause_btn)
+        # Levels are generated from level_seed(LEVEL, run_seed), so a run can be replayed exactly
+        self.run_seed = run_seed
+        # "arcade" for arcade.PhysicsEnginePlatformer, "grid" for GridPhysicsEngine
+        self.physics = physics
+        # Pre-render the static map layers into one texture per chunk (needs GL, so not headless)
+        self.bake_static = bake_static and not headless
+        # Endless mode plays one procedurally streamed world (an EndlessWorld) instead of the maps
+        self.endless = endless
+        self.world = None
+        # Moving hazards and gems rolled per map level (a recording replays with the count it was made with)
+        self.movers_per_level = movers_per_level
+
+        # Fixed-step simulation: on_update banks real time and runs whole steps of step_time.
+        # Per-step constants are rescaled so gameplay speed doesn't depend on the rate.
+        self.step_time = 1 / simulation_rate
+        self.step_scale = TUNED_RATE / simulation_rate
+        self.move_speed = PLAYER_MOVEMENT_SPEED * self.step_scale
+        self.jump_speed = PLAYER_JUMP_SPEED * self.step_scale
+        self.gravity = GRAVITY * self.step_scale ** 2
+        self.camera_speed = 1 - (1 - CAMERA_SPEED) ** self.step_scale
+        self.accumulator = 0
+        self.steps_last_frame = 0
+        self.tick = 0
+        self.recording = None
+        self.profiler_text = None
+        self.profiler_frames = PROFILER_REFRESH_FRAMES
+        self.dropped_time = 0
+        # Player and camera positions before the last step, for interpolated drawing
+        self.prev_player_position = (0, 0)
+        self.prev_camera_position = (0, 0)
+        # Snapshots: a SnapshotRing of the last REWIND_SECONDS (map mode only), a quick-save,
+        # and per setup() the pickups a snapshot's bitmask refers to, in EntityIndex order
+        self.generation = 0
+        self.history = None
+        self.quick_save = None
+        self.rewinding = False
+        self.items = []  # (sprite, tag, layer sprite list)
+        # The sprite lists of the scene the last release_scene() emptied, to check they really get freed
+        self.released_lists = []
+        self.item_ids = {}
+        # Flags of self.items, then of the movers in self.entities
+        self.alive = np.zeros(0, dtype=bool)
+        self.alive_bits = np.packbits(self.alive)
+        self.entities = EntityStore()
+
+        # The game camera renders at render_scale.scale of the window's resolution (GUI and HUD stay native)
+        self.render_scale = None
+        self.renderer = None
+        self.last_frame_time = None
+
+        self.manager = None
+        if not headless:
+            if ADAPTIVE_RESOLUTION:
+                self.render_scale = RenderScaleController()
+                self.renderer = ScaledRenderer(self.window)
+            self.manager = arcade.gui.UIManager()
+
+            style = ASSETS.button_style()
+            pause_btn = arcade.gui.UIFlatButton(text="Pause", width=120, style=style)
+            @pause_btn.event("on_click")
+            def on_click_pause(event):
+                VIEWS.pause(self)
+
+            self.anchor = self.manager.add(arcade.gui.UIAnchorLayout())
+            self.anchor.add(anchor_x="right", anchor_y="top", align_x=-20, align_y=-20, child=pause_btn)
 
         self.player_sprite = None
         self.physics_engine = None
+        # The engine of the last released scene, pointed at the next scene's walls instead of building another
+        self.spare_physics_engine = None
         self.scene = None
         self.tile_map = None
+        self.map_name = None
+        self.heightmap = None
+        self.entity_index = None
+        self.chunks = None
+        self.tile_size = 0
+        self.last_setup_ms = 0
         self.camera = None
         self.gui_camera = None
+        self.score_text = None
+        self.level_text = None
+        self.lives_text = None
 
         self.map_width = 0
         self.map_height = 0
-        self.walk_textures_right = []
-        self.walk_textures_left = []
         self.walk_index = 0
         self.facing_right = True
 
@@ -244,6 +2173,7 @@ class GameView(arcade.View):
         self.reset_score = True
 
         self.lives = 3
+        self.game_over = False
 
         # UI Sprite List
         self.ui_list = arcade.SpriteList()
@@ -260,11 +2190,7 @@ class GameView(arcade.View):
         # --- LEVEL CONFIGURATION ---
         self.LEVEL = 1
 
-        self.BASE_CRATE = 20
-        self.BASE_COIN = 15
-        self.BASE_BOMB = 10
-        self.BASE_GEM = 5
-        self.BASE_CHECK = 5
+        self.BASE_CRATE, self.BASE_COIN, self.BASE_BOMB, self.BASE_GEM, self.BASE_CHECK = BASE_SPAWN_RATES
 
         self.curr_crate = 0
         self.curr_coin = 0
@@ -273,211 +2199,650 @@ class GameView(arcade.View):
         self.curr_check = 0
 
         # --- DYNAMIC TEXTURE LOADING ---
-        # Using the passed character_data to build paths
-        # Structure: :resources:/images/animated_characters/{path}/{prefix}_{action}.png
-        folder = self.character_data['path']
-        prefix = self.character_data['prefix']
-
-        base_path = f":resources:/images/animated_characters/{folder}/{prefix}"
-
-        self.player_texture_idle = arcade.load_texture(f"{base_path}_idle.png")
-        self.player_texture_jump_right = arcade.load_texture(f"{base_path}_jump.png")
-        self.player_texture_fall_right = arcade.load_texture(f"{base_path}_fall.png")
-
-        # Create mirrored versions
-        self.player_texture_jump_left = self.player_texture_jump_right.flip_left_right()
-        self.player_texture_fall_left = self.player_texture_fall_right.flip_left_right()
-
-        for i in range(8):
-            tex = arcade.load_texture(f"{base_path}_walk{i}.png")
-            self.walk_textures_right.append(tex)
-            self.walk_textures_left.append(tex.flip_left_right())
-
-        self.collect_coin_sound = arcade.load_sound(":resources:sounds/coin1.wav")
-        self.collect_gem_sound = arcade.load_sound(":resources:sounds/coin2.wav")
-        self.collect_key_sound = arcade.load_sound(":resources:sounds/secret2.wav")
-        self.jump_sound = arcade.load_sound(":resources:sounds/jump1.wav")
-        self.gameover_sound = arcade.load_sound(":resources:sounds/gameover1.wav")
-
-    def get_ground_y(self, x_pos):
-        ground_y = -100
-        if "Platforms" in self.scene:
-            for tile in self.scene["Platforms"]:
-                if tile.left < x_pos < tile.right:
-                    if tile.top > ground_y:
-                        ground_y = tile.top
-        return ground_y
-
-    def place_dynamic_objects(self):
-        scan_step = 300
-
-        limit_crate = self.curr_crate
-        limit_coin = limit_crate + self.curr_coin
-        limit_bomb = limit_coin + self.curr_bomb
-        limit_gem = limit_bomb + self.curr_gem
-        limit_check = limit_gem + self.curr_check
-
-        print(f"Level {self.LEVEL} Stats | Bombs: {self.curr_bomb}% | Crate: {self.curr_crate}%")
-
-        for x_coord in range(400, int(self.map_width - 200), scan_step):
-            actual_x = x_coord + random.randint(-50, 50)
-            ground_y = self.get_ground_y(actual_x)
-
-            if ground_y < 0:
-                continue
-
-            roll = random.randint(1, 100)
-
-            if roll <= limit_crate:
-                previous_box = None
-                stack_height = random.randint(1, 3)
-                for i in range(stack_height):
-                    crate = arcade.Sprite(":resources:images/tiles/boxCrate_double.png", TILE_SCALING)
-                    crate.center_x = actual_x
-                    if i == 0:
-                        crate.bottom = ground_y
-                    else:
-                        crate.bottom = previous_box.top
-                    self.scene.add_sprite("Obstacles", crate)
-                    previous_box = crate
-
-                coin = arcade.Sprite(":resources:/images/items/coinSilver.png", COIN_SCALING)
-                coin.center_x = actual_x
-                coin.bottom = previous_box.top + 10
-                self.scene.add_sprite("Coins_Silver", coin)
-
-            elif roll <= limit_coin:
-                for i in range(3):
-                    coin = arcade.Sprite(":resources:/images/items/coinBronze.png", COIN_SCALING)
-                    coin.center_x = actual_x + (i * 40)
-                    coin.bottom = ground_y + 10
-                    self.scene.add_sprite("Coins_Bronze", coin)
-
-            elif roll <= limit_bomb:
-                bomb = arcade.Sprite(":resources:images/tiles/bomb.png", TILE_SCALING)
-                bomb.center_x = actual_x
-                bomb.bottom = ground_y
-                self.scene.add_sprite("Bombs", bomb)
-
-            elif roll <= limit_gem:
-                gem = arcade.Sprite(":resources:/images/items/gemRed.png", COIN_SCALING)
-                gem.center_x = actual_x
-                gem.bottom = ground_y + 250
-                self.scene.add_sprite("Gems", gem)
-
-            elif roll <= limit_check:
-                key = arcade.Sprite(":resources:/images/items/keyBlue.png", COIN_SCALING)
-                key.center_x = actual_x
-                key.bottom = ground_y + 10
-                self.scene.add_sprite("Keys", key)
+        # Textures and sounds come from the shared cache, so restarts don't decode them again
+        self.set_character(self.character_data)
+
+        sounds = ASSETS.sounds()
+        self.collect_coin_sound = sounds["coin"]
+        self.collect_gem_sound = sounds["gem"]
+        self.collect_key_sound = sounds["key"]
+        self.jump_sound = sounds["jump"]
+        self.gameover_sound = sounds["gameover"]
+
+        # Headless views keep the voice pools (so their stats still mean something) but play
+        # nothing, timing voices on the simulation clock
+        if headless:
+            self.sounds = SoundManager(NullAudioBackend(clock=lambda: self.tick * self.step_time))
+        else:
+            self.sounds = SOUNDS
+        self.sounds.register(*sounds.values())
+
+    def set_character(self, character_data):
+        self.character_data = character_data
+        textures = ASSETS.character(character_data)
+
+        self.player_texture_idle = textures["idle"]
+        self.player_texture_jump_right = textures["jump_right"]
+        self.player_texture_fall_right = textures["fall_right"]
+        self.player_texture_jump_left = textures["jump_left"]
+        self.player_texture_fall_left = textures["fall_left"]
+        self.walk_textures_right = textures["walk_right"]
+        self.walk_textures_left = textures["walk_left"]
+        # Snapshots store the player's texture as an index (it also sets the hit box)
+        self.player_textures = [self.player_texture_idle, self.player_texture_jump_right, self.player_texture_fall_right,
+                                self.player_texture_jump_left, self.player_texture_fall_left,
+                                *self.walk_textures_right, *self.walk_textures_left]
+        self.texture_ids = {id(texture): i for i, texture in enumerate(self.player_textures)}
+
+    def reset(self, character_data=None, run_seed=None, endless=False, start_level=1):
+        """Start a new run in this view, keeping its GUI, cameras, texts, player sprite and physics engine."""
+        if character_data is not None and character_data is not self.character_data:
+            self.set_character(character_data)
+        self.run_seed = run_seed
+        self.endless = endless
+        self.recording = None
+        self.tick = 0
+        self.accumulator = 0
+        self.dropped_time = 0
+        self.last_frame_time = None
+        self.quick_save = None
+        self.rewinding = False
+        self.walk_index = 0
+        self.facing_right = True
+        self.score = 0
+        self.reset_score = True
+        self.lives = 3
+        self.game_over = False
+        self.level = 1
+        self.LEVEL = start_level
+        self.checkpoint_x = 128
+        self.checkpoint_y = 128
+        self.setup()
+
+    def release_scene(self):
+        """Empty the scene and hand its item sprites (and endless terrain) back to SPRITE_POOL."""
+        if self.scene is None:
+            return
+        pooled = [sprite for sprite, _, _ in self.items] + self.entities.clear()
+        for name in ITEM_LAYERS + ["Platforms"]:
+            if name in self.scene:
+                pooled.extend(self.scene[name])
+        self.chunks.clear()
+        for name in self.scene_layer_names:
+            self.scene[name].clear()
+        SPRITE_POOL.release(pooled)
+
+        self.released_lists = [weakref.ref(self.scene[name]) for name in self.scene_layer_names]
+        self.scene = None
+        self.tile_map = None
+        if self.physics_engine is not None:
+            # Keep the engine for the next scene, without this scene's walls
+            if self.physics == "grid":
+                self.physics_engine.grid = None
+            else:
+                self.physics_engine.walls.clear()
+            self.spare_physics_engine = self.physics_engine
+        self.physics_engine = None
+        self.entity_index = None
+        self.world = None
+        self.items = []
+        self.item_ids = {}
+        self.history = None
+
+    def memory_stats(self):
+        """Live sprites per scene layer, the pool's counters, and whether the last released scene's lists are gone."""
+        return {
+            "layers": {name: len(self.scene[name]) for name in self.scene_layer_names} if self.scene else {},
+            "pool": SPRITE_POOL.stats(),
+            "released_scene_freed": all(ref() is None for ref in self.released_lists),
+        }
+
+    def place_dynamic_objects(self, placements):
+        """Take sprites from SPRITE_POOL and add them one batch per layer. Returns {layer: sprites}."""
+        textures = ASSETS.items()
+        batches = {kind: [] for kind in ITEMS}
+
+        for kind, center_x, bottom in placements:
+            texture, scale, bottom_offset, _ = textures[kind]
+            batches[kind].append(SPRITE_POOL.acquire(kind, texture, scale, center_x, bottom + bottom_offset))
+
+        layers = {}
+        for kind, sprites in batches.items():
+            if sprites:
+                self.scene[ITEMS[kind][2]].extend(sprites)
+                layers.setdefault(ITEMS[kind][2], []).extend(sprites)
+        return layers
+
+    def place_movers(self):
+        """Roll self.movers_per_level movers from the level seed into self.entities and ENTITY_LAYER."""
+        # A separate stream, so the item layout doesn't depend on the movers
+        rng = random.Random(f"movers:{level_seed(self.LEVEL, self.run_seed)}")
+        movers = generate_movers(rng, self.heightmap, self.map_width, self.movers_per_level)
+        if not movers:
+            return
+        textures = ASSETS.entities()
+        kinds = list(ENTITY_KINDS)
+        sprites = []
+        rows = []
+        for kind, origin_x, ground_y, phase in movers:
+            texture, scale, box = textures[kind]
+            _, _, _, motion, amplitude, period, height = ENTITY_KINDS[kind]
+            origin_y = ground_y - box[1] + height
+            sprites.append(SPRITE_POOL.acquire(kind, texture, scale, origin_x, origin_y))
+            rows.append((kinds.index(kind), motion, origin_x, origin_y, box, amplitude, period, phase))
+        kind_codes, motions, origin_xs, origin_ys, boxes, amplitudes, periods, phases = zip(*rows)
+        self.entities.add_many(kind_codes, motions, origin_xs, origin_ys, boxes, amplitudes, periods, phases,
+                               sprites=sprites, sprite_list=self.scene[ENTITY_LAYER])
+
+    def spawn_rates(self, difficulty):
+        """Item percentages (crate, coin, bomb, gem, check) for a difficulty LEVEL."""
+        return level_spawn_rates(difficulty, (self.BASE_CRATE, self.BASE_COIN, self.BASE_BOMB, self.BASE_GEM, self.BASE_CHECK))
 
     def setup(self):
-        lvl_mult = self.LEVEL - 1
+        start = time.perf_counter()
+        if self.recording is None:
+            self.recording = Recording.for_view(self)
+        self.release_scene()
+        self.generation += 1
+        self.items = []
+        self.item_ids = {}
+        rates = self.spawn_rates(self.LEVEL)
+        self.curr_crate, self.curr_coin, self.curr_bomb, self.curr_gem, self.curr_check = rates
+
+        if self.endless:
+            self.setup_endless_scene()
+            source = "streamed"
+        else:
+            source = self.setup_map_scene(rates)
 
-        self.curr_crate = min(35, self.BASE_CRATE + (3 * lvl_mult))
-        self.curr_coin = min(20, self.BASE_COIN + (1 * lvl_mult))
-        self.curr_bomb = min(40, self.BASE_BOMB + (5 * lvl_mult))
-        self.curr_gem = min(10, self.BASE_GEM + (1 * lvl_mult))
-        self.curr_check = min(15, self.BASE_CHECK + (1 * lvl_mult))
+        # The player sprite lives as long as the view; a new scene only puts it back at the start
+        if self.player_sprite is None:
+            self.player_sprite = arcade.Sprite(self.player_texture_idle)
+        else:
+            self.player_sprite.texture = self.player_texture_idle
+            self.player_sprite.change_x = 0
+            self.player_sprite.change_y = 0
+        self.player_sprite.center_x = self.checkpoint_x
+        self.player_sprite.center_y = self.checkpoint_y
+        self.scene.add_sprite("Player", self.player_sprite)
 
-        layer_options = {"Platforms": {"use_spatial_hash": True}}
-        map_name = f":resources:tiled_maps/map2_level_{self.level}.json"
+        # Platforms are spatially hashed; crates are not, so arcade's engine only gets nearby chunks
+        self.platform_walls = [self.scene["Platforms"]] if "Platforms" in self.scene else []
+        self.setup_physics([self.scene["Obstacles"]] + self.platform_walls)
 
-        try:
-            self.tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options)
-        except FileNotFoundError:
-            print(f"Map {map_name} not found, resetting local map to level 1")
-            self.level = 1
-            map_name = f":resources:tiled_maps/level_{self.level}.json"
-            self.tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options)
+        if self.camera is None:
+            if self.headless:
+                self.camera = HeadlessCamera()
+                self.gui_camera = HeadlessCamera()
+            else:
+                self.camera = arcade.Camera2D()
+                self.gui_camera = arcade.Camera2D()
+        self.camera.position = (self.player_sprite.center_x, self.player_sprite.center_y)
+        self.snap_interpolation()
+        self.update_chunks()
 
+        if self.reset_score: self.score = 0
+        self.reset_score = True
+
+        if self.score_text is None:
+            make_text = HeadlessText if self.headless else arcade.Text
+            self.score_text = make_text(f"Score: {self.score}", x=130, y=10, font_size=30, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
+            self.level_text = make_text(f"Level: {self.LEVEL}", x=10, y=10, font_size=30, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
+            self.lives_text = make_text(f"x {self.lives}", x=50, y=WINDOW_HEIGHT - 40, font_size=50, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
+        else:
+            self.score_text.text = f"Score: {self.score}"
+            self.level_text.text = f"Level: {self.LEVEL}"
+            self.lives_text.text = f"x {self.lives}"
+
+        # Streamed chunks come and go, so endless mode keeps no rewind history
+        self.alive = np.ones(len(self.items) + len(self.entities), dtype=bool)
+        self.alive_bits = np.packbits(self.alive)
+        steps_per_second = round(1 / self.step_time)
+        self.history = None if self.endless else SnapshotRing(REWIND_SECONDS * steps_per_second, len(self.alive))
+
+        self.last_setup_ms = (time.perf_counter() - start) * 1000
+        LEVEL_LOADER.swap_times.append(self.last_setup_ms)
+        LEVEL_LOADER.sources[source] += 1
+
+        # Start on the next level while this one is played
+        if self.prefetch and not self.endless:
+            next_difficulty = self.LEVEL + 1
+            LEVEL_LOADER.prefetch(self.level + 1, next_difficulty, self.spawn_rates(next_difficulty), self.run_seed)
+
+    def setup_physics(self, wall_layers):
+        """Point the physics engine at the player and wall_layers, building one only the first time."""
+        engine = self.spare_physics_engine
+        if engine is None:
+            if self.physics == "grid":
+                engine = GridPhysicsEngine(
+                    self.player_sprite,
+                    walls=wall_layers,
+                    gravity_constant=self.gravity,
+                    cell_size=self.tile_size,
+                )
+            else:
+                engine = arcade.PhysicsEnginePlatformer(
+                    self.player_sprite,
+                    walls=wall_layers,
+                    gravity_constant=self.gravity
+                )
+        else:
+            engine.player_sprite = self.player_sprite
+            if self.physics == "grid":
+                engine.grid = TileGrid(wall_layers, self.tile_size)
+            else:
+                engine.walls[:] = wall_layers
+                engine.jumps_since_ground = 0
+        self.physics_engine = engine
+
+    def setup_map_scene(self, rates):
+        """Build the Scene, pickup index and chunks of the current map level; returns where it came from."""
+        # Use the level prepared in the background if there is one, otherwise load it now
+        request = (self.level, self.LEVEL, rates, self.run_seed)
+        level_data = LEVEL_LOADER.take(*request)
+        prefetched = level_data is not None
+        if not prefetched:
+            level_data = load_level_data(*request)
+
+        self.level = level_data.level
+        self.map_name = level_data.map_name
+        self.tile_map = level_data.tile_map
+        self.heightmap = level_data.heightmap
         self.scene = arcade.Scene.from_tilemap(self.tile_map)
 
+        # The map was parsed lazily, so GL buffers are created here on the main thread
+        if not self.headless:
+            for sprite_list in self.tile_map.sprite_lists.values():
+                sprite_list.initialize()
+
+        self.tile_size = self.tile_map.tile_width * self.tile_map.scaling
         self.map_width = (self.tile_map.width * self.tile_map.tile_width) * self.tile_map.scaling
         self.map_height = (self.tile_map.height * self.tile_map.tile_height) * self.tile_map.scaling
 
-        self.scene.add_sprite_list("Coins_Bronze")
-        self.scene.add_sprite_list("Coins_Silver")
-        self.scene.add_sprite_list("Gems")
-        self.scene.add_sprite_list("Keys")
-        self.scene.add_sprite_list("Obstacles")
-        self.scene.add_sprite_list("Bombs")
+        for layer in ITEM_LAYERS:
+            self.scene.add_sprite_list(layer)
+        self.scene.add_sprite_list(ENTITY_LAYER)
 
-        self.place_dynamic_objects()
+        self.place_dynamic_objects(level_data.placements)
+        self.place_movers()
+
+        # Pickups and hazards never move, so one grid answers every player overlap query
+        self.entity_index = EntityIndex()
+        self.entity_index.add_layers(self.scene, PICKUP_LAYERS)
+        self.items = [(sprite, tag, self.scene[layer]) for layer, tag in PICKUP_LAYERS.items() if layer in self.scene
+                      for sprite in self.scene[layer]]
+        self.item_ids = {sprite: i for i, (sprite, _, _) in enumerate(self.items)}
 
         if "Foreground" in self.scene:
             self.scene.add_sprite_list_after("Player", "Foreground")
         else:
             self.scene.add_sprite_list("Player")
 
-        self.player_sprite = arcade.Sprite(self.player_texture_idle)
-        self.player_sprite.center_x = self.checkpoint_x
-        self.player_sprite.center_y = self.checkpoint_y
-        self.scene.add_sprite("Player", self.player_sprite)
-
-        wall_layers = [self.scene["Obstacles"]]
-        if "Platforms" in self.scene:
-            wall_layers.append(self.scene["Platforms"])
-
-        self.physics_engine = arcade.PhysicsEnginePlatformer(
-            self.player_sprite,
-            walls=wall_layers,
-            gravity_constant=GRAVITY
-        )
-
-        self.camera = arcade.Camera2D()
-        self.gui_camera = arcade.Camera2D()
-        self.camera.position = (self.player_sprite.center_x, self.player_sprite.center_y)
-
-        if self.reset_score: self.score = 0
-        self.reset_score = True
-
-        self.score_text = arcade.Text(f"Score: {self.score}", x=130, y=10, font_size=30, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
-        self.level_text = arcade.Text(f"Level: {self.LEVEL}", x=10, y=10, font_size=30, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
-        self.lives_text = arcade.Text(f"x {self.lives}", x=50, y=WINDOW_HEIGHT - 40, font_size=50, font_name=RETRO_FONT, color=COLOR_TEXT_MAIN)
+        # Same draw order as the Scene: map layers (item layers replace any of the same name),
+        # then item layers and movers, with the player right above the foreground. Movers cross
+        # chunk borders, so their layer is drawn whole.
+        names = [name for name in self.tile_map.sprite_lists if name not in ITEM_LAYERS] + ITEM_LAYERS + [ENTITY_LAYER]
+        names.insert(names.index("Foreground") + 1 if "Foreground" in names else len(names), "Player")
+        self.scene_layer_names = names
+        self.chunks = ChunkedScene([(self.scene[name], name not in ("Player", ENTITY_LAYER)) for name in names])
+        if self.bake_static:
+            static = [self.scene[name] for name in names
+                      if name in self.tile_map.sprite_lists and name not in PICKUP_LAYERS and name not in ITEM_LAYERS]
+            self.chunks.bake(static, self.window.ctx)
+        return "prefetched" if prefetched else "loaded inline"
+
+    def setup_endless_scene(self):
+        """Empty streamed layers, filled in by an EndlessWorld as the camera moves; starts the first chunks."""
+        self.scene = arcade.Scene()
+        self.scene.add_sprite_list("Platforms", use_spatial_hash=True)
+        for layer in ITEM_LAYERS:
+            self.scene.add_sprite_list(layer)
+        self.scene.add_sprite_list("Player")
+        self.entity_index = EntityIndex()
+
+        self.scene_layer_names = ["Platforms"] + ITEM_LAYERS + ["Player"]
+        self.chunks = ChunkedScene([(self.scene[name], name != "Player") for name in self.scene_layer_names])
+        self.world = EndlessWorld(self, self.LEVEL)
+        self.world.update(0, WINDOW_WIDTH, budget=math.inf)
+
+        self.tile_size = self.world.tile_size
+        self.map_width = math.inf
+        self.map_height = ENDLESS_HEIGHT
+        self.checkpoint_x, self.checkpoint_y = self.world.spawn_point()
 
     def on_show_view(self):
         self.manager.enable()
         arcade.set_background_color(COLOR_BG_GAME)
+        # Time spent in other views isn't a frame of this one
+        self.last_frame_time = None
+
+    def on_resize(self, width, height):
+        # on_draw clamps the drawn camera to window.width/height; keep the cameras the window's size
+        if self.camera is not None and not self.headless:
+            self.camera.match_window(position=False)
+            self.gui_camera.match_window(position=True)
 
     def on_hide_view(self):
         self.manager.disable()
 
     def on_draw(self):
-        self.clear()
+        span = PROFILER.start()
+        now = time.perf_counter()
+        if self.render_scale and self.last_frame_time is not None:
+            self.render_scale.update(now - self.last_frame_time)
+        self.last_frame_time = now
+        if self.renderer:
+            self.renderer.begin(self.camera, self.render_scale.scale, COLOR_BG_GAME)
+        # The upscaled buffer covers the whole window, so only a direct draw needs a clear
+        if not (self.renderer and self.renderer.active):
+            self.clear()
+
+        # Draw between the last two simulation steps, then restore the simulated positions
+        alpha = self.interpolation_alpha
+        player_position = self.player_sprite.position
+        camera_position = self.camera.position
+        self.player_sprite.position = lerp_position(self.prev_player_position, player_position, alpha)
+        drawn_camera = lerp_position(self.prev_camera_position, camera_position, alpha)
+        self.camera.position = self.clamp_camera(drawn_camera, self.window.width / 2, self.window.height / 2)
+
         self.camera.use()
-        self.scene.draw()
+        if self.entities:
+            self.entities.sync(self.scene[ENTITY_LAYER])
+        self.chunks.draw()
+        if self.renderer:
+            self.renderer.finish()
+        self.player_sprite.position = player_position
+        self.camera.position = camera_position
+        span = PROFILER.lap("scene_draw", span)
 
         self.gui_camera.use()
         self.manager.draw()
+        span = PROFILER.lap("manager_draw", span)
         self.score_text.draw()
         self.level_text.draw()
 
         self.ui_list.draw()
         self.lives_text.draw()
+        PROFILER.lap("hud_draw", span)
+
+        if PROFILER.enabled:
+            self.draw_profiler_overlay()
+        VIEWS.frame_drawn()
+
+    def draw_profiler_overlay(self):
+        """Phase percentiles and per-layer sprite counts, recomputed every PROFILER_REFRESH_FRAMES."""
+        if self.profiler_text is None:
+            self.profiler_text = arcade.Text("", x=10, y=WINDOW_HEIGHT - 80, font_size=12, color=arcade.color.BLACK,
+                                             font_name=("Courier New", "DejaVu Sans Mono", "monospace"),
+                                             multiline=True, width=420, anchor_y="top")
+        self.profiler_frames += 1
+        if self.profiler_frames >= PROFILER_REFRESH_FRAMES:
+            self.profiler_frames = 0
+            lines = ["phase               p50      p95      p99  (ms)"]
+            for name, (p50, p95, p99) in PROFILER.percentiles().items():
+                lines.append(f"{name:18s}{p50:7.3f}  {p95:7.3f}  {p99:7.3f}")
+            lines.append(f"draw calls {self.chunks.stats['draw_calls']}, sprites drawn {self.chunks.stats['sprites']}")
+            for sprite_list, _ in self.chunks.layers:
+                name = next((name for name in self.scene_layer_names if self.scene[name] is sprite_list), "baked")
+                lines.append(f"  {name}: {len(sprite_list)}")
+            if self.renderer:
+                width, height = self.renderer.size
+                lines.append(f"render scale {self.render_scale.scale:.3f} ({width}x{height}), {self.render_scale.changes} changes")
+            for transition, (count, p50, worst) in VIEWS.stats().items():
+                lines.append(f"{transition}: {p50:.1f} ms median, {worst:.1f} ms max ({count})")
+            setups = LEVEL_LOADER.stats()
+            lines.append(f"level setup: {setups['median_ms']:.1f} ms median, {setups['max_ms']:.1f} ms max "
+                         f"(last {self.last_setup_ms:.1f} ms), {setups['sources'].get('prefetched', 0)} prefetched")
+            pool = SPRITE_POOL.stats()
+            lines.append(f"sprite pool: {sum(pool['free'].values())} spare, {pool['created']} created, {pool['reused']} reused")
+            self.profiler_text.text = "\n".join(lines)
+        self.profiler_text.draw()
+
+    def clamp_camera(self, position, half_width, half_height):
+        """position moved so a view half_width x half_height around it stays inside the level."""
+        x_pos, y_pos = position
+        world_left = self.world.left if self.world else 0
+        if x_pos < world_left + half_width: x_pos = world_left + half_width
+        elif x_pos > self.map_width - half_width: x_pos = self.map_width - half_width
+        if y_pos < half_height: y_pos = half_height
+        elif y_pos > self.map_height - half_height: y_pos = self.map_height - half_height
+        return x_pos, y_pos
+
+    def update_chunks(self):
+        """Activate the chunks in view, widened to the player, whom the camera trails."""
+        camera_x = self.camera.position[0]
+        player_x = self.player_sprite.center_x
+        left = min(camera_x - WINDOW_WIDTH / 2, player_x) - CHUNK_MARGIN
+        right = max(camera_x + WINDOW_WIDTH / 2, player_x) + CHUNK_MARGIN
+        if self.world:
+            self.world.update(left, right)
+        # A wider window draws more, and its camera clamp can shift the drawn view by up to the difference
+        extra = max(self.window.width - WINDOW_WIDTH, 0)
+        if self.chunks.update_view(left - extra, right + extra) and self.physics == "arcade":
+            self.physics_engine.walls[:] = self.chunks.active(self.scene["Obstacles"]) + self.platform_walls
+
+    def play_sound(self, sound):
+        self.sounds.play(sound)
 
     def respawn_player(self):
         self.lives -= 1
         self.lives_text.text = f"x {self.lives}"
-        arcade.play_sound(self.gameover_sound)
+        self.play_sound(self.gameover_sound)
 
         if self.lives > 0:
+            # In endless mode the checkpoint's chunk may have been evicted since
+            if self.world and self.checkpoint_x < self.world.left:
+                self.checkpoint_x, self.checkpoint_y = self.world.spawn_point()
             self.player_sprite.change_x = 0
             self.player_sprite.change_y = 0
             self.player_sprite.center_x = self.checkpoint_x
             self.player_sprite.center_y = self.checkpoint_y
             self.camera.position = (self.checkpoint_x, self.checkpoint_y)
+            self.snap_interpolation()
         else:
-            # SWITCH TO GAME OVER VIEW and pass current character
-            game_over_view = GameOverView(character_data=self.character_data)
-            self.window.show_view(game_over_view)
+            # The caller ends the step here; on_update then shows the game over view
+            self.game_over = True
+
+    def end_run(self):
+        """Save the recording, release the scene and switch to the game over view."""
+        if RECORD_RUNS:
+            self.save_recording()
+        self.release_scene()
+        # SWITCH TO GAME OVER VIEW and pass current character
+        VIEWS.game_over(self)
+
+    def handle_collisions(self):
+        hits = self.entity_index.overlapping(self.player_sprite)
+
+        # Hazards in HAZARD_TAGS order, each checked again at the respawn point of the one before,
+        # so touching two at once costs one life; pickups are then checked where the player ends up
+        for tag in HAZARD_TAGS:
+            if any(hit_tag == tag for _, hit_tag in hits):
+                self.respawn_player()
+                if self.game_over:
+                    return
+                hits = self.entity_index.overlapping(self.player_sprite)
+
+        for sprite, tag in hits:
+            if tag not in HAZARD_TAGS:
+                self.collect(sprite, tag)
+
+        if self.entities:
+            self.handle_entity_hits()
+
+    def handle_entity_hits(self):
+        """Move the movers one step, then respawn on a hazard or collect the pickups the player touches."""
+        entities = self.entities
+        entities.update(self.step_scale)
+        player = self.player_sprite
+        hits = entities.overlapping(player.left, player.bottom, player.right, player.top)
+        if not len(hits):
+            return
+        kinds = list(ENTITY_KINDS)
+        tags = [ENTITY_KINDS[kinds[kind]][2] for kind in entities.kind[hits]]
+        if any(tag in HAZARD_TAGS for tag in tags):
+            self.respawn_player()
+            return
+        for row, tag in zip(hits, tags):
+            entities.kill(row)
+            self.alive[len(self.items) + row] = False
+            self.apply_pickup(tag, float(entities.x[row]), float(entities.y[row]))
+        self.alive_bits = np.packbits(self.alive)
+
+    def collect(self, sprite, tag):
+        self.entity_index.remove(sprite)
+        sprite.remove_from_sprite_lists()
+        item = self.item_ids.get(sprite)
+        if item is not None:
+            self.alive[item] = False
+            self.alive_bits = np.packbits(self.alive)
+        self.apply_pickup(tag, sprite.center_x, sprite.center_y)
+
+    def apply_pickup(self, tag, x_pos, y_pos):
+        if tag == "coin_gold":
+            self.play_sound(self.collect_coin_sound)
+            self.score += SCORE_GOLD
+        elif tag == "coin_bronze":
+            self.play_sound(self.collect_coin_sound)
+            self.score += SCORE_BRONZE
+        elif tag == "coin_silver":
+            self.play_sound(self.collect_coin_sound)
+            self.score += SCORE_SILVER
+        elif tag == "gem":
+            self.play_sound(self.collect_gem_sound)
+            self.score += SCORE_GEM
+            self.lives += 1
+        elif tag == "key":
+            self.play_sound(self.collect_key_sound)
+            self.checkpoint_x = x_pos
+            self.checkpoint_y = y_pos
+
+    def save_recording(self, path=None):
+        """Write the run's input log (to RECORDINGS_DIR by default) and return its path."""
+        if path is None:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            path = os.path.join(RECORDINGS_DIR, f"run-{time.strftime('%Y%m%d-%H%M%S')}.rec")
+        self.recording.finish(self)
+        self.recording.save(path)
+        print(f"Recording saved to {path}")
+        return path
+
+    def snap_interpolation(self):
+        """Start drawing from the current positions, e.g. after a teleport."""
+        self.prev_player_position = self.player_sprite.position
+        self.prev_camera_position = self.camera.position
+
+    @property
+    def interpolation_alpha(self):
+        """How far the accumulator is into the next step: where on_draw draws between the last two."""
+        return self.accumulator / self.step_time
 
     def on_update(self, delta_time):
+        self.sounds.end_frame()
+        self.accumulator += delta_time
+        steps = 0
+        # A hair of tolerance so frames of exactly step_time always run one step
+        while self.accumulator >= self.step_time - 1e-9 and not self.game_over:
+            if steps == MAX_CATCH_UP_STEPS:
+                # Too far behind to catch up: drop the backlog and run slow rather than spiral
+                self.dropped_time += self.accumulator
+                self.accumulator = 0
+                break
+            self.prev_player_position = self.player_sprite.position
+            self.prev_camera_position = self.camera.position
+            self.step()
+            self.accumulator -= self.step_time
+            steps += 1
+        self.accumulator = max(self.accumulator, 0)
+        self.steps_last_frame = steps
+        if self.game_over and not self.headless:
+            self.end_run()
+
+    def snapshot(self):
+        """The simulation state as a SNAPSHOT_DTYPE record and the packed alive flags of self.items and movers."""
+        player = self.player_sprite
+        camera_x, camera_y = self.camera.position
+        record = (self.generation, player.center_x, player.center_y, player.change_x, player.change_y,
+                  camera_x, camera_y, self.checkpoint_x, self.checkpoint_y,
+                  self.walk_index, self.texture_ids.get(id(player.texture), 0), self.facing_right,
+                  self.score, self.lives, self.LEVEL, self.entities.time)
+        return record, self.alive_bits
+
+    def restore_snapshot(self, record, mask):
+        """Put the simulation back to a snapshot of this level; returns False for another level's."""
+        if record["generation"] != self.generation:
+            return False
+        player = self.player_sprite
+        player.texture = self.player_textures[record["texture"]]
+        player.center_x = float(record["x"])
+        player.center_y = float(record["y"])
+        player.change_x = float(record["change_x"])
+        player.change_y = float(record["change_y"])
+        self.camera.position = (float(record["camera_x"]), float(record["camera_y"]))
+        self.checkpoint_x = float(record["checkpoint_x"])
+        self.checkpoint_y = float(record["checkpoint_y"])
+        self.walk_index = float(record["walk_index"])
+        self.facing_right = bool(record["facing_right"])
+        self.score = int(record["score"])
+        self.lives = int(record["lives"])
+        self.LEVEL = int(record["LEVEL"])
+
+        count = len(self.items)
+        alive = np.unpackbits(mask, count=len(self.alive)).astype(bool)
+        for item in np.flatnonzero(alive[:count] != self.alive[:count]):
+            sprite, tag, sprite_list = self.items[item]
+            if alive[item]:
+                self.entity_index.add(sprite, tag, order=item)
+                sprite_list.append(sprite)
+                self.chunks.add_chunk(sprite_list, int(sprite.center_x // self.chunks.chunk_width), [sprite])
+            else:
+                self.entity_index.remove(sprite)
+                sprite.remove_from_sprite_lists()
+        if self.entities:
+            self.entities.set_alive(alive[count:])
+            self.entities.time = float(record["entity_time"])
+            self.entities.update(0)
+        self.alive = alive
+        self.alive_bits = np.packbits(alive)
+
+        self.score_text.text = f"Score: {self.score}"
+        self.lives_text.text = f"x {self.lives}"
+        self.level_text.text = f"Level: {self.LEVEL}"
+        self.snap_interpolation()
+        self.update_chunks()
+        return True
+
+    def take_quick_save(self):
+        if self.history is None:
+            print("Quick-save is not available in endless mode")
+            return
+        record, mask = self.snapshot()
+        self.quick_save = (np.array(record, dtype=SNAPSHOT_DTYPE), mask.copy())
+
+    def load_quick_save(self):
+        if self.quick_save is None or not self.restore_snapshot(*self.quick_save):
+            print("No quick-save for this level")
+
+    def step(self):
+        """Advance the simulation by one fixed step."""
+        # While rewinding, each step restores the one before it instead of simulating
+        if self.rewinding and self.history is not None:
+            snapshot = self.history.pop()
+            if snapshot is not None:
+                self.restore_snapshot(*snapshot)
+            self.end_step()
+            return
+        if self.history is not None:
+            self.history.push(*self.snapshot())
+
+        span = PROFILER.start()
         if self.physics_engine:
             self.physics_engine.update()
+        span = PROFILER.lap("physics", span)
 
-        if self.player_sprite.left < 0:
-            self.player_sprite.left = 0
+        world_left = self.world.left if self.world else 0
+        if self.player_sprite.left < world_left:
+            self.player_sprite.left = world_left
 
         if self.player_sprite.change_x > 0: self.facing_right = True
         elif self.player_sprite.change_x < 0: self.facing_right = False
@@ -488,100 +2853,348 @@ class GameView(arcade.View):
             else:
                 self.player_sprite.texture = self.player_texture_fall_right if self.facing_right else self.player_texture_fall_left
         elif abs(self.player_sprite.change_x) > 0:
-            self.walk_index += 0.2
+            self.walk_index += 0.2 * self.step_scale
             if self.walk_index >= len(self.walk_textures_right): self.walk_index = 0
             self.player_sprite.texture = self.walk_textures_right[int(self.walk_index)] if self.facing_right else self.walk_textures_left[int(self.walk_index)]
         else:
             self.walk_index = 0
             self.player_sprite.texture = self.player_texture_idle
+        span = PROFILER.lap("animation", span)
 
         # Collisions
-        if "Bombs" in self.scene:
-            if arcade.check_for_collision_with_list(self.player_sprite, self.scene["Bombs"]):
-                self.respawn_player()
-
-        if "Don't Touch" in self.scene:
-            if arcade.check_for_collision_with_list(self.player_sprite, self.scene["Don't Touch"]):
-                self.respawn_player()
-
-        if "Coins" in self.scene:
-            gold_hit = arcade.check_for_collision_with_list(self.player_sprite, self.scene["Coins"])
-            for coin in gold_hit:
-                coin.remove_from_sprite_lists()
-                arcade.play_sound(self.collect_coin_sound)
-                self.score += SCORE_GOLD
-
-        bronze_hit = arcade.check_for_collision_with_list(self.player_sprite, self.scene["Coins_Bronze"])
-        for coin in bronze_hit:
-            coin.remove_from_sprite_lists()
-            arcade.play_sound(self.collect_coin_sound)
-            self.score += SCORE_BRONZE
-
-        silver_hit = arcade.check_for_collision_with_list(self.player_sprite, self.scene["Coins_Silver"])
-        for coin in silver_hit:
-            coin.remove_from_sprite_lists()
-            arcade.play_sound(self.collect_coin_sound)
-            self.score += SCORE_SILVER
-
-        gem_hit = arcade.check_for_collision_with_list(self.player_sprite, self.scene["Gems"])
-        for gem in gem_hit:
-            gem.remove_from_sprite_lists()
-            arcade.play_sound(self.collect_gem_sound)
-            self.score += SCORE_GEM
-            self.lives += 1
+        self.handle_collisions()
+        span = PROFILER.lap("collisions", span)
+        if self.game_over:
+            self.end_step()
+            return
 
-        key_hit = arcade.check_for_collision_with_list(self.player_sprite, self.scene["Keys"])
-        for key in key_hit:
-            key.remove_from_sprite_lists()
-            arcade.play_sound(self.collect_key_sound)
-            self.checkpoint_x = key.center_x
-            self.checkpoint_y = key.center_y
-
-        self.score_text.text = f"Score: {self.score}"
+        # Nothing draws the score headless, so don't format it every step
+        if not self.headless:
+            self.score_text.text = f"Score: {self.score}"
+        span = PROFILER.lap("score_text", span)
 
         if self.player_sprite.top < 0:
             self.respawn_player()
+            if self.game_over:
+                self.end_step()
+                return
+
+        # Endless mode has no level end: LEVEL is the difficulty of the chunk underfoot
+        if self.world:
+            difficulty = self.world.difficulty_at(self.player_sprite.center_x)
+            if difficulty != self.LEVEL:
+                self.LEVEL = difficulty
+                self.curr_crate, self.curr_coin, self.curr_bomb, self.curr_gem, self.curr_check = self.spawn_rates(difficulty)
+                self.level_text.text = f"Level: {self.LEVEL}"
 
         # Level End
-        if self.player_sprite.center_x >= self.map_width:
+        elif self.player_sprite.center_x >= self.map_width:
             self.level += 1
             self.LEVEL += 1
             self.reset_score = False
             self.checkpoint_x = 128
             self.checkpoint_y = 128
             self.setup()
+        span = PROFILER.lap("level_checks", span)
 
-        # Camera
-        screen_center_x = self.window.width / 2
-        screen_center_y = self.window.height / 2
-        target_x = self.player_sprite.center_x
-        target_y = self.player_sprite.center_y
-
-        if target_x < screen_center_x: target_x = screen_center_x
-        elif target_x > self.map_width - screen_center_x: target_x = self.map_width - screen_center_x
-        if target_y < screen_center_y: target_y = screen_center_y
-        elif target_y > self.map_height - screen_center_y: target_y = self.map_height - screen_center_y
+        # Camera: simulated for a WINDOW_WIDTH x WINDOW_HEIGHT view whatever the window's size, so runs replay the same
+        target_x, target_y = self.clamp_camera(self.player_sprite.position, WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
 
         curr_x, curr_y = self.camera.position
-        self.camera.position = (curr_x + (target_x - curr_x) * CAMERA_SPEED, curr_y + (target_y - curr_y) * CAMERA_SPEED)
+        self.camera.position = (curr_x + (target_x - curr_x) * self.camera_speed, curr_y + (target_y - curr_y) * self.camera_speed)
+        self.update_chunks()
+        PROFILER.lap("camera", span)
+        self.end_step()
+
+    def end_step(self):
+        # The tick keeps counting through rewinds: it is the clock the input recording uses
+        self.tick += 1
+        if self.tick % RECORDING_CHECK_INTERVAL == 0:
+            self.recording.check(self)
 
     def on_key_press(self, key, modifiers):
+        if key in SIMULATION_KEYS:
+            self.recording.record(self.tick, "press", key)
         if key in [arcade.key.UP, arcade.key.W] and self.physics_engine.can_jump():
-            self.player_sprite.change_y = PLAYER_JUMP_SPEED
-            arcade.play_sound(self.jump_sound)
+            self.player_sprite.change_y = self.jump_speed
+            self.play_sound(self.jump_sound)
         elif key in [arcade.key.LEFT, arcade.key.A]:
-            self.player_sprite.change_x = -PLAYER_MOVEMENT_SPEED
+            self.player_sprite.change_x = -self.move_speed
         elif key in [arcade.key.RIGHT, arcade.key.D]:
-            self.player_sprite.change_x = PLAYER_MOVEMENT_SPEED
+            self.player_sprite.change_x = self.move_speed
+        elif key == REWIND_KEY:
+            self.rewinding = True
+        elif key == QUICK_SAVE_KEY:
+            self.take_quick_save()
+        elif key == QUICK_LOAD_KEY:
+            self.load_quick_save()
+        elif key == arcade.key.F3:
+            PROFILER.enabled = not PROFILER.enabled
+        elif key == arcade.key.F4:
+            path = PROFILER.export_chrome_trace(f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+            print(f"Trace written to {path}")
 
     def on_key_release(self, key, modifiers):
+        if key in SIMULATION_KEYS:
+            self.recording.record(self.tick, "release", key)
         if key in [arcade.key.LEFT, arcade.key.A, arcade.key.RIGHT, arcade.key.D]:
             self.player_sprite.change_x = 0
+        elif key == REWIND_KEY:
+            self.rewinding = False
+
+class ScriptedInput:
+    """Key events to replay by simulation tick: [(tick, "press" | "release", key), ...]."""
+    def __init__(self, events=()):
+        self.events = {}
+        for tick, action, key in events:
+            self.events.setdefault(tick, []).append((action, key))
+
+    @classmethod
+    def run_right(cls, ticks, jump_every=45):
+        """Hold right for the whole run and tap jump at a fixed interval."""
+        events = [(0, "press", arcade.key.RIGHT)]
+        for tick in range(jump_every, ticks, jump_every):
+            events.append((tick, "press", arcade.key.UP))
+            events.append((tick + 1, "release", arcade.key.UP))
+        return cls(events)
+
+    def apply(self, game_view, tick):
+        for action, key in self.events.get(tick, ()):
+            if action == "press":
+                game_view.on_key_press(key, 0)
+            else:
+                game_view.on_key_release(key, 0)
+
+
+class HeadlessRunner:
+    """Steps a headless GameView as fast as the CPU allows and reports throughput."""
+    def __init__(self, game_view, script=None):
+        self.game_view = game_view
+        self.script = script if script else ScriptedInput()
+        self.tick = 0
+
+    def run(self, ticks):
+        view = self.game_view
+        start = time.perf_counter()
+        for _ in range(ticks):
+            if view.game_over:
+                break
+            view.sounds.end_frame()
+            self.script.apply(view, self.tick)
+            view.step()
+            self.tick += 1
+        elapsed = time.perf_counter() - start
+
+        ticks_per_second = self.tick / elapsed if elapsed > 0 else float("inf")
+        return {
+            "ticks": self.tick,
+            "seconds": elapsed,
+            "ticks_per_second": ticks_per_second,
+            "realtime_factor": ticks_per_second * view.step_time,
+            "score": view.score,
+            "lives": view.lives,
+            "level": view.LEVEL,
+            "game_over": view.game_over,
+        }
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Recording:
+    """A run's start, key events by tick, state checksums and outcome, saved in a compact binary format."""
+    MAGIC = b"PREC"
+    VERSION = 3
+    # magic, version, run seed, LEVEL, map, character, physics, rate, endless, movers per level
+    HEADER = struct.Struct("<4sBqHHBBHBH")
+    OUTCOME = struct.Struct("<IiiddH?")  # ticks, score, lives, checkpoint x/y, LEVEL, game over
+    PHYSICS = ["arcade", "grid"]
+    ACTIONS = ["press", "release"]
+
+    def __init__(self, run_seed, start_level, start_map, character, physics, rate, endless=False,
+                 movers_per_level=MOVERS_PER_LEVEL):
+        self.run_seed = run_seed
+        self.start_level = start_level
+        self.start_map = start_map
+        self.character = character
+        self.physics = physics
+        self.rate = rate
+        self.endless = endless
+        self.movers_per_level = movers_per_level
+        self.events = []  # (tick, action, key)
+        self.checks = []  # (tick, state checksum)
+        self.outcome = None
+
+    @classmethod
+    def for_view(cls, view):
+        return cls(view.run_seed or 0, view.LEVEL, view.level, CHARACTERS.index(view.character_data),
+                   view.physics, round(1 / view.step_time), view.endless, view.movers_per_level)
+
+    @staticmethod
+    def outcome_of(view):
+        return {
+            "ticks": view.tick,
+            "score": view.score,
+            "lives": view.lives,
+            "checkpoint": (view.checkpoint_x, view.checkpoint_y),
+            "level": view.LEVEL,
+            "game_over": view.game_over,
+        }
+
+    def record(self, tick, action, key):
+        self.events.append((tick, action, key))
+
+    def check(self, view):
+        player = view.player_sprite
+        state = struct.pack("<ddddii", player.center_x, player.center_y, player.change_x, player.change_y,
+                            view.score, view.lives)
+        self.checks.append((view.tick, zlib.crc32(state)))
+
+    def finish(self, view):
+        self.outcome = self.outcome_of(view)
+
+    def script(self):
+        return ScriptedInput(self.events)
+
+    def make_view(self):
+        """A headless GameView set up exactly as the recorded run started."""
+        view = GameView(character_data=CHARACTERS[self.character], headless=True, run_seed=self.run_seed,
+                        physics=self.physics, simulation_rate=self.rate, endless=self.endless,
+                        movers_per_level=self.movers_per_level)
+        view.LEVEL = self.start_level
+        view.level = self.start_map
+        view.setup()
+        return view
+
+    def save(self, path):
+        out = bytearray(self.HEADER.pack(self.MAGIC, self.VERSION, self.run_seed, self.start_level, self.start_map,
+                                         self.character, self.PHYSICS.index(self.physics), self.rate, self.endless,
+                                         self.movers_per_level))
+        out += struct.pack("<I", len(self.events))
+        last = 0
+        for tick, action, key in self.events:
+            write_varint(out, tick - last)
+            out.append(self.ACTIONS.index(action))
+            write_varint(out, key)
+            last = tick
+        out += struct.pack("<I", len(self.checks))
+        last = 0
+        for tick, checksum in self.checks:
+            write_varint(out, tick - last)
+            out += struct.pack("<I", checksum)
+            last = tick
+        outcome = self.outcome
+        out += self.OUTCOME.pack(outcome["ticks"], outcome["score"], outcome["lives"], *outcome["checkpoint"],
+                                 outcome["level"], outcome["game_over"])
+        with open(path, "wb") as f:
+            f.write(out)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version = struct.unpack_from("<4sB", data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} recording")
+        _, _, run_seed, start_level, start_map, character, physics, rate, endless, movers = cls.HEADER.unpack_from(data)
+        recording = cls(run_seed, start_level, start_map, character, cls.PHYSICS[physics], rate, bool(endless), movers)
+
+        pos = cls.HEADER.size
+        (count,), pos = struct.unpack_from("<I", data, pos), pos + 4
+        tick = 0
+        for _ in range(count):
+            delta, pos = read_varint(data, pos)
+            action = cls.ACTIONS[data[pos]]
+            key, pos = read_varint(data, pos + 1)
+            tick += delta
+            recording.events.append((tick, action, key))
+        (count,), pos = struct.unpack_from("<I", data, pos), pos + 4
+        tick = 0
+        for _ in range(count):
+            delta, pos = read_varint(data, pos)
+            (checksum,), pos = struct.unpack_from("<I", data, pos), pos + 4
+            tick += delta
+            recording.checks.append((tick, checksum))
+
+        ticks, score, lives, checkpoint_x, checkpoint_y, level, game_over = cls.OUTCOME.unpack_from(data, pos)
+        recording.outcome = {
+            "ticks": ticks, "score": score, "lives": lives, "checkpoint": (checkpoint_x, checkpoint_y),
+            "level": level, "game_over": game_over,
+        }
+        return recording
+
+
+def run_headless(args):
+    view = GameView(character_data=CHARACTERS[args.character], headless=True, run_seed=args.seed,
+                    physics=args.physics, simulation_rate=args.rate, endless=args.endless)
+    view.LEVEL = args.level
+    view.setup()
+    PROFILER.enabled = bool(args.profile)
+    stats = HeadlessRunner(view, ScriptedInput.run_right(args.ticks)).run(args.ticks)
+    print(f"{stats['ticks']} ticks in {stats['seconds']:.2f}s | "
+          f"{stats['ticks_per_second']:.0f} ticks/s ({stats['realtime_factor']:.0f}x real time at {args.rate} Hz) | "
+          f"score {stats['score']} | lives {stats['lives']} | level {stats['level']}")
+    if args.record:
+        view.save_recording(args.record)
+    if args.profile:
+        for name, (p50, p95, p99) in PROFILER.percentiles().items():
+            print(f"{name:18s} p50 {p50:.3f} ms | p95 {p95:.3f} ms | p99 {p99:.3f} ms")
+        print(f"Trace written to {PROFILER.export_chrome_trace(args.profile)}")
+
 
 def main():
+    global RECORD_RUNS
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument("--headless", action="store_true", help="simulate without a window and report ticks/s")
+    parser.add_argument("--ticks", type=int, default=60 * 60, help="ticks to simulate in headless mode")
+    parser.add_argument("--level", type=int, default=1, help="difficulty LEVEL to start at in headless mode")
+    parser.add_argument("--character", type=int, default=0, help="index into CHARACTERS")
+    parser.add_argument("--seed", type=int, default=None, help="run seed for level generation")
+    parser.add_argument("--physics", choices=["arcade", "grid"], default="arcade", help="platformer physics engine in headless mode")
+    parser.add_argument("--rate", type=int, default=SIMULATION_RATE, help="simulation steps per second in headless mode")
+    parser.add_argument("--endless", action="store_true", help="play the procedurally streamed endless world in headless mode")
+    parser.add_argument("--record", metavar="PATH", help="save the headless run's input log to PATH")
+    parser.add_argument("--save-recordings", action="store_true", help=f"save each windowed run to {RECORDINGS_DIR}/ on game over")
+    parser.add_argument("--replay", metavar="PATH", help="replay a recorded run headless and check its outcome")
+    parser.add_argument("--profile", metavar="PATH", help="profile the headless run and write a Chrome trace to PATH")
+    parser.add_argument("--validate", type=int, metavar="SEEDS", help="validate SEEDS run seeds' layouts at every LEVEL and exit")
+    parser.add_argument("--max-level", type=int, default=10, help="highest LEVEL to validate")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --validate (default: one per CPU)")
+    args = parser.parse_args()
+    if args.save_recordings:
+        RECORD_RUNS = True
+
+    if args.validate:
+        from validation import run_validation
+        run_validation(args.validate, args.max_level, args.workers)
+        return
+
+    if args.replay:
+        from replay import run_replay
+        run_replay(args.replay)
+        return
+
+    if args.headless:
+        run_headless(args)
+        return
+
     window = arcade.Window(WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE, resizable=True)
-    start_view = MenuView()
-    window.show_view(start_view)
+    window.show_view(LoadingView())
     arcade.run()
 
 if __name__ == "__main__":
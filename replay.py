@@ -0,0 +1,43 @@
+"""
+Replay tooling for the platformer game's run recordings
+Usage: python replay.py PATH   (or python main.py --replay PATH)
+"""
+import sys
+
+import main
+
+
+def replay(recording):
+    """Re-run a recording headless; returns the HeadlessRunner stats plus a list of "divergences"."""
+    view = recording.make_view()
+    stats = main.HeadlessRunner(view, recording.script()).run(recording.outcome["ticks"])
+
+    divergences = []
+    recorded_checks = dict(recording.checks)
+    for tick, checksum in view.recording.checks:
+        if tick in recorded_checks and recorded_checks[tick] != checksum:
+            divergences.append(("state", tick))
+            break
+    outcome = main.Recording.outcome_of(view)
+    for field in ("ticks", "score", "lives", "checkpoint", "level", "game_over"):
+        if outcome[field] != recording.outcome[field]:
+            divergences.append((field, recording.outcome[field], outcome[field]))
+    stats["divergences"] = divergences
+    return stats
+
+
+def run_replay(path):
+    recording = main.Recording.load(path)
+    stats = replay(recording)
+    print(f"Replayed {stats['ticks']} ticks in {stats['seconds']:.2f}s "
+          f"({stats['realtime_factor']:.0f}x faster than it was played) | "
+          f"score {stats['score']} | lives {stats['lives']} | level {stats['level']}")
+    if stats["divergences"]:
+        for divergence in stats["divergences"]:
+            print(f"DIVERGED: {divergence}")
+        sys.exit(1)
+    print("Replay matches the recording")
+
+
+if __name__ == "__main__":
+    run_replay(sys.argv[1])
@@ -0,0 +1,73 @@
+"""EntityIndex lookups and the hazards and pickups GameView.handle_collisions acts on."""
+import arcade
+import pytest
+
+import main
+
+
+def block(x, y, size=40):
+    sprite = arcade.SpriteSolidColor(size, size)
+    sprite.position = (x, y)
+    return sprite
+
+
+def test_overlapping_in_insertion_order():
+    index = main.EntityIndex()
+    far = block(1000, 1000)
+    bomb, coin, spikes = block(100, 100), block(110, 100), block(90, 110)
+    for sprite, tag in ((far, "coin_gold"), (bomb, "bomb"), (coin, "coin_gold"), (spikes, "hazard")):
+        index.add(sprite, tag)
+    player = block(100, 100)
+    assert index.overlapping(player) == [(bomb, "bomb"), (coin, "coin_gold"), (spikes, "hazard")]
+
+    index.remove(coin)
+    assert index.overlapping(player) == [(bomb, "bomb"), (spikes, "hazard")]
+    assert len(index) == 3
+
+
+def test_overlapping_across_cells():
+    index = main.EntityIndex(cell_size=128)
+    edge = block(130, 130)
+    index.add(edge, "gem")
+    assert index.overlapping(block(110, 110)) == [(edge, "gem")]
+    assert index.overlapping(block(300, 300)) == []
+
+
+@pytest.fixture
+def view():
+    view = main.GameView(headless=True, run_seed=3, physics="grid")
+    view.setup()
+    view.player_sprite.position = (2000, 600)
+    return view
+
+
+def place(view, tag, offset=0):
+    sprite = block(view.player_sprite.center_x + offset, view.player_sprite.center_y)
+    view.entity_index.add(sprite, tag)
+    return sprite
+
+
+def test_two_hazards_at_once_cost_one_life(view):
+    place(view, "bomb")
+    place(view, "hazard", offset=5)
+    lives = view.lives
+    view.handle_collisions()
+    assert view.lives == lives - 1
+    assert view.player_sprite.position == (view.checkpoint_x, view.checkpoint_y)
+
+
+def test_hazard_at_the_respawn_point_costs_another_life(view):
+    place(view, "bomb")
+    view.entity_index.add(block(view.checkpoint_x, view.checkpoint_y), "hazard")
+    lives = view.lives
+    view.handle_collisions()
+    assert view.lives == lives - 2
+
+
+def test_pickup_next_to_a_hazard_is_not_collected(view):
+    place(view, "bomb")
+    coin = place(view, "coin_gold", offset=5)
+    score = view.score
+    view.handle_collisions()
+    assert view.score == score
+    assert coin in view.entity_index.entries
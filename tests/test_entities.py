@@ -0,0 +1,85 @@
+"""EntityStore motion, overlap tests, sprite sync and visibility."""
+import arcade
+import numpy as np
+import pytest
+
+import main
+
+BOX = (-10, -10, 10, 10)
+
+
+def make_store(count=3):
+    sprite_list = arcade.SpriteList()
+    sprites = [arcade.SpriteSolidColor(20, 20) for _ in range(count)]
+    store = main.EntityStore(capacity=2)
+    store.add_many([0] * count, main.MOTION_LINEAR, np.arange(count) * 100.0, 50.0, BOX,
+                   velocity=(2, 1), sprites=sprites, sprite_list=sprite_list)
+    return store, sprites, sprite_list
+
+
+def buffer_positions(sprite_list, sprites):
+    data = np.frombuffer(sprite_list._sprite_pos_angle_data, dtype=np.float32).reshape(-1, 4)
+    return [tuple(data[sprite_list.sprite_slot[sprite], :2]) for sprite in sprites]
+
+
+def test_linear_motion_and_overlap():
+    store, _, _ = make_store()
+    store.update(5)
+    assert store.x[:3].tolist() == [10, 110, 210]
+    assert store.y[:3].tolist() == [55, 55, 55]
+    assert store.overlapping(100, 50, 120, 60).tolist() == [1]
+    assert store.overlapping(300, 0, 400, 100).tolist() == []
+
+
+def test_sync_writes_the_position_buffer():
+    store, sprites, sprite_list = make_store()
+    store.update(5)
+    store.sync(sprite_list)
+    assert buffer_positions(sprite_list, sprites) == [(10, 55), (110, 55), (210, 55)]
+    assert sprite_list._sprite_pos_angle_changed
+
+
+def test_sync_falls_back_to_sprite_positions(monkeypatch):
+    store, sprites, sprite_list = make_store()
+    # As if arcade no longer had the flag: sync must go through the sprites' setters
+    monkeypatch.delattr(sprite_list, "_sprite_pos_angle_changed")
+    store.update(5)
+    store.sync(sprite_list)
+    assert [sprite.position for sprite in sprites] == [(10, 55), (110, 55), (210, 55)]
+
+
+def test_kill_hides_and_stops_syncing():
+    store, sprites, sprite_list = make_store()
+    store.sync(sprite_list)
+    store.kill(1)
+    assert not sprites[1].visible
+    assert store.overlapping(90, 40, 110, 60).tolist() == []
+    store.update(5)
+    store.sync(sprite_list)
+    assert buffer_positions(sprite_list, sprites) == [(10, 55), (100, 50), (210, 55)]
+
+
+def test_set_alive_shows_and_hides():
+    store, sprites, sprite_list = make_store()
+    store.set_alive(np.array([False, True, False]))
+    assert [sprite.visible for sprite in sprites] == [False, True, False]
+    store.set_alive(np.array([True, True, False]))
+    assert [sprite.visible for sprite in sprites] == [True, True, False]
+    store.update(5)
+    store.sync(sprite_list)
+    assert buffer_positions(sprite_list, sprites)[:2] == [(10, 55), (110, 55)]
+    assert store.overlapping(200, 40, 220, 60).tolist() == []
+
+
+def test_clear_returns_the_sprites():
+    store, sprites, _ = make_store()
+    assert store.clear() == sprites
+    assert len(store) == 0
+    assert store.overlapping(-1000, -1000, 1000, 1000).tolist() == []
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_grows_past_capacity(count):
+    store, _, _ = make_store(count)
+    assert len(store) == count
+    assert (store.slot[:count] >= 0).all()
@@ -0,0 +1,74 @@
+"""GameEnv runs are deterministic per seed and replay from their recording."""
+import arcade
+import numpy as np
+
+import main
+from env import ENV_ACTIONS, ENV_OBSERVATION, GameEnv
+from replay import replay
+
+
+def play(env, seed, steps=150):
+    observations = [env.reset(seed)]
+    for step in range(steps):
+        observation, _, _, done = env.step(step % len(ENV_ACTIONS))
+        observations.append(observation)
+        if done:
+            break
+    return np.stack(observations)
+
+
+def test_reset_reuses_the_view_deterministically():
+    env = GameEnv(physics="grid", max_steps=150)
+    first = play(env, seed=7)
+    view = env.view
+    play(env, seed=8)
+    again = play(env, seed=7)
+    assert env.view is view
+    assert first.shape[1] == len(ENV_OBSERVATION)
+    assert np.array_equal(first, again)
+
+
+def test_episode_replays_from_its_recording():
+    env = GameEnv(physics="grid", max_steps=150)
+    play(env, seed=3)
+    env.view.recording.finish(env.view)
+    stats = replay(env.view.recording)
+    assert stats["divergences"] == []
+    assert stats["score"] == env.view.score
+
+
+def test_saved_recording_replays_with_its_movers(tmp_path):
+    view = main.GameView(headless=True, run_seed=3, physics="grid", movers_per_level=2)
+    view.setup()
+    main.HeadlessRunner(view, main.ScriptedInput.run_right(300)).run(300)
+    path = view.save_recording(tmp_path / "run.rec")
+    recording = main.Recording.load(path)
+    assert recording.movers_per_level == 2
+    stats = replay(recording)
+    assert stats["divergences"] == []
+    assert len(recording.make_view().entities) == 2
+
+
+def test_recording_keeps_only_simulation_keys():
+    view = main.GameView(headless=True, run_seed=3, physics="grid")
+    view.setup()
+    enabled = main.PROFILER.enabled
+    try:
+        for key in (arcade.key.F3, arcade.key.Z, arcade.key.RIGHT):
+            view.on_key_press(key, 0)
+            view.on_key_release(key, 0)
+    finally:
+        main.PROFILER.enabled = enabled
+    assert view.recording.events == [(0, "press", arcade.key.RIGHT), (0, "release", arcade.key.RIGHT)]
+
+
+def test_window_size_does_not_change_the_simulation():
+    runs = []
+    for width, height in [(main.WINDOW_WIDTH, main.WINDOW_HEIGHT), (1920, 1080), (800, 600)]:
+        view = main.GameView(headless=True, run_seed=3, physics="grid", endless=True)
+        view.window.width, view.window.height = width, height
+        view.setup()
+        main.HeadlessRunner(view, main.ScriptedInput.run_right(1500)).run(1500)
+        runs.append((view.recording.checks, view.camera.position, view.world.left, view.world.evicted))
+    assert runs[0][2] > 0, "no chunks evicted"
+    assert runs[1] == runs[0] and runs[2] == runs[0]
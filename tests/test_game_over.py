@@ -0,0 +1,52 @@
+"""Losing the last life in the windowed game ends the run on the game over view."""
+import arcade
+import pytest
+
+import main
+
+
+@pytest.fixture
+def window():
+    try:
+        window = arcade.Window(main.WINDOW_WIDTH, main.WINDOW_HEIGHT, visible=False)
+    except Exception as error:
+        pytest.skip(f"no GL context: {error}")
+    yield window
+    window.close()
+
+
+@pytest.fixture
+def game(window, monkeypatch):
+    monkeypatch.setattr(main, "VIEWS", main.ViewRegistry())
+    main.VIEWS.play(main.CHARACTERS[0], run_seed=3)
+    game = window.current_view
+    game.lives = 1
+    return game
+
+
+def assert_game_over(window, game):
+    game.on_update(game.step_time)
+    assert game.game_over
+    assert game.scene is None
+    assert isinstance(window.current_view, main.GameOverView)
+
+
+def test_falling_off_the_map(window, game):
+    game.player_sprite.center_x = 500
+    game.player_sprite.top = -10
+    assert_game_over(window, game)
+
+
+def test_touching_a_bomb(window, game):
+    bomb = next(sprite for sprite, tag, _ in game.items if tag == "bomb")
+    game.player_sprite.position = bomb.position
+    assert_game_over(window, game)
+
+
+def test_try_again_after_game_over(window, game):
+    game.player_sprite.top = -10
+    game.on_update(game.step_time)
+    main.VIEWS.play(game.character_data, game.run_seed, transition="restart")
+    assert window.current_view is game
+    assert not game.game_over and game.lives == 3
+    game.on_update(game.step_time)
@@ -0,0 +1,54 @@
+"""GridPhysicsEngine against arcade.PhysicsEnginePlatformer: the same inputs must give the same trajectory."""
+
+import arcade
+import pytest
+
+import main
+from bench import make_physics_world, run_physics
+
+SPEED = main.PLAYER_MOVEMENT_SPEED
+SCENARIOS = {
+    "fall and land": [],
+    "walk right": [(30, SPEED, False)],
+    "jump in place": [(40, 0, True)],
+    "walk into crate wall": [(30, SPEED, False)],
+    "jump onto crates": [(30, SPEED, False), (75, SPEED, True), (95, SPEED, True)],
+    "walk left, stop": [(30, -SPEED, False), (90, 0, False)],
+}
+
+
+def run_game(physics, level, script, ticks, seed=3):
+    """Per-tick (x, y, can_jump, score, lives) of a headless GameView."""
+    view = main.GameView(headless=True, run_seed=seed, physics=physics)
+    view.LEVEL = level
+    view.setup()
+    trajectory = []
+    for tick in range(ticks):
+        script.apply(view, tick)
+        view.step()
+        player = view.player_sprite
+        trajectory.append((player.center_x, player.center_y, view.physics_engine.can_jump(), view.score, view.lives))
+    return trajectory
+
+
+@pytest.fixture(scope="module")
+def walls():
+    return make_physics_world(40, crate_every=6)
+
+
+@pytest.mark.parametrize("script", SCENARIOS.values(), ids=SCENARIOS.keys())
+def test_scenario(walls, script):
+    expected, _ = run_physics(arcade.PhysicsEnginePlatformer, walls, script, 240)
+    actual, _ = run_physics(main.GridPhysicsEngine, walls, script, 240)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("level", [1, 3, 6])
+def test_map_trajectory(level):
+    script = main.ScriptedInput.run_right(3000)
+    expected = run_game("arcade", level, script, 3000)
+    actual = run_game("grid", level, script, 3000)
+    assert [a[0] for a in actual] == [e[0] for e in expected]
+    assert [a[2:] for a in actual] == [e[2:] for e in expected]
+    # Bumping a tile's corner can leave the engines half a pixel apart vertically for a few ticks
+    assert max(abs(a[1] - e[1]) for a, e in zip(actual, expected)) <= 0.5
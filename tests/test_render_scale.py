@@ -0,0 +1,65 @@
+"""RenderScaleController steps the render scale down over budget, back up within it, and stays in its limits."""
+import main
+
+BUDGET = 1 / 60
+WINDOW = 10
+
+
+def controller(up_frames=4 * WINDOW):
+    return main.RenderScaleController(budget=BUDGET, min_scale=0.5, step=0.125, window=WINDOW, up_frames=up_frames)
+
+
+def feed(scaler, frame_time, frames):
+    """Frames at frame_time; returns the scale after each change."""
+    return [scaler.scale for _ in range(frames) if scaler.update(frame_time)]
+
+
+def test_judges_only_full_windows():
+    scaler = controller()
+    assert feed(scaler, 2 * BUDGET, WINDOW - 1) == []
+    assert feed(scaler, 2 * BUDGET, 1) == [0.875]
+    assert scaler.changes == 1
+
+
+def test_scales_down_to_the_minimum_and_no_further():
+    scaler = controller()
+    # Each step down helps a little, so the next window keeps going down
+    frame_time = 3 * BUDGET
+    scales = []
+    for _ in range(8):
+        scales += feed(scaler, frame_time, WINDOW)
+        frame_time *= 0.9
+    assert scales == [0.875, 0.75, 0.625, 0.5]
+    assert scaler.scale == scaler.min_scale == 0.5
+
+
+def test_step_down_that_does_not_help_is_undone():
+    scaler = controller()
+    assert feed(scaler, 2 * BUDGET, WINDOW) == [0.875]
+    # Just as slow at the lower scale: back up, and never try below it again
+    assert feed(scaler, 2 * BUDGET, WINDOW) == [1.0]
+    assert scaler.min_scale == 1.0
+    assert feed(scaler, 2 * BUDGET, 3 * WINDOW) == []
+
+
+def test_scales_back_up_after_a_run_within_budget_up_to_full():
+    scaler = controller()
+    feed(scaler, 3 * BUDGET, WINDOW)
+    feed(scaler, 2 * BUDGET, WINDOW)
+    assert scaler.scale == 0.75
+    # One good window is not enough; up_frames good frames in a row are
+    assert feed(scaler, BUDGET / 2, 4 * WINDOW - 1) == []
+    assert feed(scaler, BUDGET / 2, 1) == [0.875]
+    assert feed(scaler, BUDGET / 2, 4 * WINDOW) == [1.0]
+    assert feed(scaler, BUDGET / 2, 8 * WINDOW) == []
+    assert scaler.scale == 1.0
+
+
+def test_quick_relapse_after_stepping_up_backs_off():
+    scaler = controller()
+    feed(scaler, 3 * BUDGET, WINDOW)
+    feed(scaler, BUDGET / 2, 4 * WINDOW)
+    assert scaler.scale == 1.0
+    # Over budget again right after the up-step: waits twice as long before the next try
+    assert feed(scaler, 3 * BUDGET, WINDOW) == [0.875]
+    assert scaler.up_frames == 8 * WINDOW
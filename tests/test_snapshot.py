@@ -0,0 +1,89 @@
+"""SnapshotRing order, and restore_snapshot, quick-save and rewind putting a level back exactly."""
+import numpy as np
+import pytest
+
+import main
+
+SCRIPT = main.ScriptedInput.run_right(2000)
+
+
+def state(view):
+    player = view.player_sprite
+    return (player.center_x, player.center_y, player.change_x, player.change_y,
+            view.score, view.lives, view.LEVEL, tuple(view.alive))
+
+
+def play(view, first, count):
+    """State after each tick from first to first + count - 1."""
+    states = {}
+    for tick in range(first, first + count):
+        SCRIPT.apply(view, tick)
+        view.step()
+        states[tick] = state(view)
+    return states
+
+
+@pytest.fixture
+def view():
+    view = main.GameView(headless=True, run_seed=5, physics="grid")
+    view.LEVEL = 3
+    view.setup()
+    return view
+
+
+def test_ring_pops_newest_first_and_overwrites_oldest():
+    ring = main.SnapshotRing(3, item_count=10)
+    assert ring.masks.shape == (3, 2)
+    for generation in range(5):
+        record = np.zeros((), dtype=main.SNAPSHOT_DTYPE)
+        record["generation"] = generation
+        ring.push(record, np.array([generation, 0], dtype=np.uint8))
+    assert len(ring) == 3
+
+    popped = []
+    while (snapshot := ring.pop()) is not None:
+        record, mask = snapshot
+        popped.append((int(record["generation"]), int(mask[0])))
+    assert popped == [(4, 4), (3, 3), (2, 2)]
+    assert len(ring) == 0
+
+
+def test_restore_puts_back_player_and_pickups(view):
+    play(view, 0, 50)
+    record, mask = view.snapshot()
+    record, mask = np.array(record, dtype=main.SNAPSHOT_DTYPE), mask.copy()
+    saved = state(view)
+    entity_time = view.entities.time
+    first = play(view, 50, 200)
+    assert sum(first[249][-1]) < sum(saved[-1]), "no pickups collected after the snapshot"
+
+    assert view.restore_snapshot(record, mask)
+    assert state(view) == saved
+    assert view.entities.time == entity_time
+    # Played on from the snapshot, every tick matches the first time through
+    assert play(view, 50, 200) == first
+
+
+def test_quick_load_replays_identically(view):
+    play(view, 0, 100)
+    view.take_quick_save()
+    first = play(view, 100, 300)
+    view.load_quick_save()
+    assert play(view, 100, 300) == first
+
+
+def test_rewind_steps_back_through_history(view):
+    states = play(view, 0, 250)
+    view.rewinding = True
+    for _ in range(200):
+        view.step()
+    # A snapshot is taken after that tick's key events, so only the velocities can differ
+    rewound, expected = state(view), states[249 - 200]
+    assert rewound[:2] + rewound[4:] == expected[:2] + expected[4:]
+
+
+def test_snapshot_of_another_level_is_rejected(view):
+    record, mask = view.snapshot()
+    record = np.array(record, dtype=main.SNAPSHOT_DTYPE)
+    record["generation"] += 1
+    assert not view.restore_snapshot(record, mask.copy())
@@ -0,0 +1,84 @@
+"""SoundManager pooling, merging and voice stealing, on NullAudioBackend and a fake clock."""
+import pytest
+
+import main
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSound:
+    def __init__(self, length):
+        self.length = length
+
+    def get_length(self):
+        return self.length
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sounds(clock):
+    return main.SoundManager(main.NullAudioBackend(clock=clock), voices_per_effect=3)
+
+
+def test_triggers_in_one_frame_merge(sounds):
+    coin = FakeSound(0.5)
+    for _ in range(5):
+        sounds.play(coin)
+    assert sounds.stats == {"played": 1, "merged": 4, "stolen": 0}
+    assert sum(voice.plays for voice in sounds.pools[coin]) == 1
+
+
+def test_different_effects_do_not_merge(sounds):
+    sounds.play(FakeSound(0.5))
+    sounds.play(FakeSound(0.5))
+    assert sounds.stats["played"] == 2
+    assert sounds.stats["merged"] == 0
+
+
+def test_end_frame_resets_merging(sounds, clock):
+    coin = FakeSound(0.5)
+    sounds.play(coin)
+    sounds.end_frame()
+    clock.now += 1 / 60
+    sounds.play(coin)
+    assert sounds.stats == {"played": 2, "merged": 0, "stolen": 0}
+    # The first voice is still playing, so the second play took another one
+    assert [voice.plays for voice in sounds.pools[coin]] == [0, 1, 1]
+
+
+def test_finished_voices_are_free_again(sounds, clock):
+    coin = FakeSound(0.1)
+    for _ in range(4):
+        sounds.play(coin)
+        sounds.end_frame()
+        clock.now += 1
+    assert sounds.stats == {"played": 4, "merged": 0, "stolen": 0}
+    assert sorted(voice.plays for voice in sounds.pools[coin]) == [1, 1, 2]
+
+
+def test_least_recently_started_voice_is_stolen(sounds, clock):
+    jump = FakeSound(10)
+    started = []
+    for _ in range(3):
+        sounds.play(jump)
+        started.append(sounds.pools[jump][-1])
+        sounds.end_frame()
+        clock.now += 1 / 60
+    assert len(set(map(id, started))) == 3
+
+    sounds.play(jump)
+    assert sounds.stats["stolen"] == 1
+    assert started[0].plays == 2
+    assert started[0].ends_at == pytest.approx(clock.now + 10)
+    # The stolen voice is now the most recently started
+    assert list(sounds.pools[jump]) == [started[1], started[2], started[0]]
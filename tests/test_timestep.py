@@ -0,0 +1,56 @@
+"""GameView.on_update's fixed-step accumulator: steps per frame, the catch-up clamp and the draw alpha."""
+import arcade
+import pytest
+
+import main
+
+
+@pytest.fixture
+def view():
+    view = main.GameView(headless=True, run_seed=3, physics="grid")
+    view.setup()
+    return view
+
+
+def test_irregular_frames_run_whole_steps_and_carry_the_rest(view):
+    # Frame times in steps, with the steps each should run and the fraction left over
+    frames = [(0.4, 0, 0.4), (0.4, 0, 0.8), (0.4, 1, 0.2), (2.5, 2, 0.7),
+              (0.05, 0, 0.75), (1.0, 1, 0.75), (0.7, 1, 0.45), (0.7, 1, 0.15)]
+    tick = view.tick
+    for frame, steps, left in frames:
+        view.on_update(frame * view.step_time)
+        assert view.steps_last_frame == steps
+        assert view.interpolation_alpha == pytest.approx(left)
+    assert view.tick == tick + sum(steps for _, steps, _ in frames)
+    assert view.dropped_time == 0
+
+
+def test_frames_of_exactly_one_step_run_one_step_each(view):
+    for _ in range(120):
+        view.on_update(view.step_time)
+        assert view.steps_last_frame == 1
+    assert view.interpolation_alpha == pytest.approx(0, abs=1e-6)
+
+
+def test_long_frame_is_clamped_and_the_backlog_dropped(view):
+    view.on_update((main.MAX_CATCH_UP_STEPS + 2.5) * view.step_time)
+    assert view.steps_last_frame == main.MAX_CATCH_UP_STEPS
+    assert view.accumulator == 0
+    assert view.dropped_time == pytest.approx(2.5 * view.step_time)
+    # The next frame carries on at the normal rate
+    view.on_update(1.5 * view.step_time)
+    assert view.steps_last_frame == 1
+    assert view.interpolation_alpha == pytest.approx(0.5)
+
+
+def test_draws_between_the_last_two_steps(view):
+    for _ in range(30):
+        view.on_update(view.step_time)
+    before = view.player_sprite.position
+    view.on_key_press(arcade.key.RIGHT, 0)
+    view.on_update(1.25 * view.step_time)
+    after = view.player_sprite.position
+    assert view.prev_player_position == before
+    assert view.interpolation_alpha == pytest.approx(0.25)
+    drawn_x, _ = main.lerp_position(before, after, view.interpolation_alpha)
+    assert before[0] < drawn_x < after[0]
@@ -0,0 +1,76 @@
+"""ReachabilityValidator on hand-built layouts: flat ground with one obstacle."""
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+TILE = 64
+COLUMNS = 50
+MAP_WIDTH = COLUMNS * TILE
+GROUND = 128
+
+
+def heightmap(extra=()):
+    """Flat ground COLUMNS wide with its top at GROUND, plus (column, top) tiles."""
+    tiles = [SimpleNamespace(left=col * TILE, right=(col + 1) * TILE, top=GROUND) for col in range(COLUMNS)]
+    tiles += [SimpleNamespace(left=col * TILE, right=(col + 1) * TILE, top=top) for col, top in extra]
+    return main.Heightmap(tiles, TILE)
+
+
+def crate_stack(col, count):
+    crate_height = main.ASSETS.item_height("crate")
+    return [("crate", col * TILE + TILE / 2, GROUND + i * crate_height) for i in range(count)]
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return main.ReachabilityValidator()
+
+
+def test_flat_ground(validator):
+    report = validator.validate(heightmap(), [], MAP_WIDTH)
+    assert report["exit_reachable"]
+    assert report["reachable_surfaces"] == report["surfaces"]
+
+
+def test_low_stack_can_be_jumped(validator):
+    report = validator.validate(heightmap(), crate_stack(20, 2), MAP_WIDTH)
+    assert report["exit_reachable"]
+    assert report["blocking_crates"] == []
+
+
+def test_tall_stack_blocks_the_exit(validator):
+    stack = crate_stack(20, 8)
+    report = validator.validate(heightmap(), stack, MAP_WIDTH)
+    assert not report["exit_reachable"]
+    assert sorted(report["blocking_crates"]) == sorted(stack)
+
+
+def test_tall_stack_is_repaired(validator):
+    placements, report = validator.repair(heightmap(), crate_stack(20, 8), MAP_WIDTH)
+    assert report["exit_reachable"]
+    assert report["repairs"]["crates_removed"] >= 5
+    assert len(placements) == 8 - report["repairs"]["crates_removed"]
+
+
+def test_tall_wall_blocks_the_exit(validator):
+    wall = [(20, GROUND + TILE * i) for i in range(1, 11)]
+    report = validator.validate(heightmap(wall), [], MAP_WIDTH)
+    assert not report["exit_reachable"]
+    assert report["reachable_surfaces"] == 20
+    assert report["blocking_crates"] == []
+
+
+def test_solid_high_overhead_does_not_block(validator):
+    # A ledge with more than the hit box's height under it is run under, not into
+    ledge = [(20, GROUND + TILE + main.PLAYER_HITBOX_SIZE[1] + TILE)]
+    report = validator.validate(heightmap(ledge), [], MAP_WIDTH)
+    assert report["exit_reachable"]
+
+
+def test_gem_out_of_reach(validator):
+    gem = ("gem", 10 * TILE + TILE / 2, GROUND + 1000)
+    coin = ("coin_bronze", 12 * TILE + TILE / 2, GROUND + 32)
+    report = validator.validate(heightmap(), [gem, coin], MAP_WIDTH)
+    assert report["unreachable"] == [gem]
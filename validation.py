@@ -0,0 +1,80 @@
+"""
+Batch layout validation for the platformer game: generate many seeds' layouts and check them
+Usage: python validation.py SEEDS [--max-level N] [--workers N]   (or python main.py --validate SEEDS)
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import main
+
+
+def map_levels(max_level):
+    """Map level played at each difficulty LEVEL up to max_level, following the game's fallback to level 1."""
+    levels = []
+    resolved = {}
+    level = 1
+    for _ in range(max_level):
+        if level not in resolved:
+            resolved[level] = main.load_level_map(level)[0]
+        level = resolved[level]
+        levels.append(level)
+        level += 1
+    return levels
+
+
+# Map level -> (heightmap, width), parsed once per validation worker process
+VALIDATION_MAPS = {}
+
+
+def validate_seed_batch(map_level, difficulty, seeds):
+    """Generate and validate one LEVEL's layout for each run seed (runs in a worker process)."""
+    if map_level not in VALIDATION_MAPS:
+        VALIDATION_MAPS[map_level] = main.load_level_map(map_level)[3:]
+    heightmap, map_width = VALIDATION_MAPS[map_level]
+    spawn_rates = main.level_spawn_rates(difficulty)
+    stats = {"seeds": 0, "bad": 0, "unreachable": 0, "blocked": 0, "seconds": 0.0}
+    for run_seed in seeds:
+        rng = random.Random(main.level_seed(difficulty, run_seed))
+        placements = main.generate_placements(rng, heightmap, map_width, spawn_rates)
+        start = time.perf_counter()
+        report = main.VALIDATOR.validate(heightmap, placements, map_width)
+        stats["seconds"] += time.perf_counter() - start
+        stats["seeds"] += 1
+        stats["unreachable"] += len(report["unreachable"])
+        stats["blocked"] += not report["exit_reachable"]
+        stats["bad"] += bool(report["unreachable"]) or not report["exit_reachable"]
+    return difficulty, stats
+
+
+def run_validation(seeds, max_level, workers=None, batch_size=250):
+    """Validate `seeds` run seeds at every LEVEL up to max_level on a process pool and print a table."""
+    totals = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(validate_seed_batch, map_level, difficulty, range(first, min(first + batch_size, seeds)))
+                   for difficulty, map_level in enumerate(map_levels(max_level), start=1)
+                   for first in range(0, seeds, batch_size)]
+        for future in futures:
+            difficulty, stats = future.result()
+            total = totals.setdefault(difficulty, dict.fromkeys(stats, 0))
+            for key, value in stats.items():
+                total[key] += value
+    elapsed = time.perf_counter() - start
+
+    print("LEVEL |  seeds |  bad % | unreachable | blocked | ms/layout")
+    for difficulty, total in sorted(totals.items()):
+        print(f"{difficulty:5d} | {total['seeds']:6d} | {100 * total['bad'] / total['seeds']:5.1f}% | "
+              f"{total['unreachable']:11d} | {total['blocked']:7d} | {1000 * total['seconds'] / total['seeds']:9.3f}")
+    layouts = sum(total["seeds"] for total in totals.values())
+    print(f"Validated {layouts} layouts in {elapsed:.2f}s ({layouts / elapsed:.0f} layouts/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate generated layouts")
+    parser.add_argument("seeds", type=int, help="run seeds to validate at every LEVEL")
+    parser.add_argument("--max-level", type=int, default=10, help="highest LEVEL to validate")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    run_validation(args.seeds, args.max_level, args.workers)